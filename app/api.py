@@ -0,0 +1,226 @@
+# app/api.py
+
+import hashlib
+import json
+import os
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import async_crud, crud, http_cache, profiler
+from .database import get_async_read_db, get_async_write_db, pool_stats
+
+router = APIRouter(prefix="/api")
+
+# Operational endpoints (pool stats) are only mounted when DEBUG_ENDPOINTS=1
+DEBUG_ENDPOINTS = os.getenv("DEBUG_ENDPOINTS", "0").lower() in ("1", "true", "yes")
+
+
+# JSON routes answer 401 instead of redirecting to /login
+def require_user(request: Request):
+    user_id = request.session.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return user_id
+
+
+def transaction_to_dict(row):
+    return {
+        "id": row.id,
+        "date": row.date.isoformat(),
+        "type": row.type,
+        "amount": row.amount,
+        "description": row.description,
+        "category_id": row.category_id,
+        "category": row.category,
+    }
+
+
+def json_response(request: Request, payload) -> Response:
+    """JSON response with a content ETag; 304 when the client already has it"""
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if http_cache.etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@router.get("/transactions")
+async def list_transactions(
+    request: Request,
+    user_id: int = Depends(require_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    type: str = None,  # income / expense / all
+    category: str = None,  # category name
+    category_id: int = None,
+    from_date: date = Query(None, alias="from"),
+    to_date: date = Query(None, alias="to"),
+    cursor: str = None,
+    limit: int = Query(50, ge=1, le=500),
+):
+    parsed_cursor = crud.decode_cursor(cursor) if cursor else None
+    if cursor and parsed_cursor is None:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    rows = await async_crud.get_transaction_page(
+        user_id, db=db, type=type, from_date=from_date, to_date=to_date,
+        category=category_id if category_id is not None else category,
+        cursor=parsed_cursor, limit=limit + 1,
+    )
+    next_cursor = crud.encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+
+    return json_response(request, {
+        "items": [transaction_to_dict(row) for row in rows[:limit]],
+        "next_cursor": next_cursor,
+    })
+
+
+@router.get("/transactions/{txn_id}")
+async def get_transaction(
+    txn_id: int,
+    request: Request,
+    user_id: int = Depends(require_user),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    txn = await async_crud.get_transaction_by_id(txn_id=txn_id, user_id=user_id, db=db)
+    if not txn:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return json_response(request, {
+        "id": txn.id,
+        "date": txn.date.isoformat(),
+        "type": txn.type,
+        "amount": txn.amount,
+        "description": txn.description,
+        "category_id": txn.category_id,
+        "category": txn.category.name if txn.category else None,
+    })
+
+
+
+@router.get("/series")
+async def get_series(
+    request: Request,
+    user_id: int = Depends(require_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    granularity: str = Query("day", pattern="^(day|week|month|quarter|year)$"),
+    from_date: date = Query(None, alias="from"),
+    to_date: date = Query(None, alias="to"),
+    type: str = Query(None, pattern="^(income|expense)$"),
+    category: str = None,  # category name
+    max_points: int = Query(None, ge=3, le=10000),
+    method: str = Query("lttb", pattern="^(lttb|minmax)$"),
+):
+    """Income / expense / profit / loss per bucket as parallel arrays"""
+    from . import timeseries
+
+    to_date = to_date or date.today()
+    from_date = from_date or timeseries.last_periods(granularity, 30, to_date)[0]
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    limit = timeseries.MAX_PERIODS[granularity]
+    if timeseries.bucket_count(granularity, from_date, to_date) > limit:
+        raise HTTPException(status_code=400, detail=f"At most {limit} {granularity} buckets per request")
+
+    series = await async_crud.get_chart_series(
+        user_id, granularity, from_date, to_date, db=db,
+        type=type, category=category, max_points=max_points, method=method,
+    )
+    return json_response(request, series)
+
+# Budgets: many categories x many months per request, each call one statement
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+MAX_BUDGET_ROWS = 5000
+
+
+def parse_month(value):
+    year, month = value.split("-")
+    return int(year), int(month)
+
+
+class BudgetEntry(BaseModel):
+    category_id: int
+    month: str = Field(pattern=MONTH_PATTERN)  # YYYY-MM
+    budget: float = Field(ge=0)
+
+
+class BudgetBatch(BaseModel):
+    budgets: list[BudgetEntry] = Field(max_length=MAX_BUDGET_ROWS)
+
+
+class BudgetRange(BaseModel):
+    first: str = Field(pattern=MONTH_PATTERN)
+    last: str = Field(pattern=MONTH_PATTERN)
+    budgets: dict[int, float]  # category_id -> budget for every month in the range
+
+
+class BudgetCopy(BaseModel):
+    source: str | None = Field(None, pattern=MONTH_PATTERN)  # default: the month before target
+    target: str | None = Field(None, pattern=MONTH_PATTERN)  # default: this month
+    overwrite: bool = False  # replace budgets already set in target
+
+
+@router.put("/budgets")
+async def set_budgets(
+    batch: BudgetBatch,
+    user_id: int = Depends(require_user),
+    db: AsyncSession = Depends(get_async_write_db),
+):
+    """Set budgets for any categories and months (INSERT ... ON CONFLICT DO UPDATE)"""
+    rows = [(entry.category_id, *parse_month(entry.month), entry.budget) for entry in batch.budgets]
+    try:
+        updated = await async_crud.set_budgets(user_id=user_id, budgets=rows, db=db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"updated": updated}
+
+
+@router.put("/budgets/range")
+async def set_budget_range(
+    body: BudgetRange,
+    user_id: int = Depends(require_user),
+    db: AsyncSession = Depends(get_async_write_db),
+):
+    """The same budget per category for every month from first to last"""
+    first, last = parse_month(body.first), parse_month(body.last)
+    if first > last:
+        raise HTTPException(status_code=400, detail="'first' must not be after 'last'")
+    months = (last[0] - first[0]) * 12 + last[1] - first[1] + 1
+    if months * len(body.budgets) > MAX_BUDGET_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BUDGET_ROWS} budgets per request")
+    if any(budget < 0 for budget in body.budgets.values()):
+        raise HTTPException(status_code=400, detail="Budgets must not be negative")
+    try:
+        updated = await async_crud.set_budget_range(
+            user_id=user_id, budgets=body.budgets, first=first, last=last, db=db
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"updated": updated, "months": months}
+
+
+@router.post("/budgets/copy")
+async def copy_budgets(
+    body: BudgetCopy,
+    user_id: int = Depends(require_user),
+    db: AsyncSession = Depends(get_async_write_db),
+):
+    """Copy one month's budgets forward (by default last month's into this month)"""
+    target = parse_month(body.target) if body.target else None
+    source = parse_month(body.source) if body.source else None
+    copied = await async_crud.copy_budgets_forward(
+        user_id=user_id, target=target, source=source, overwrite=body.overwrite, db=db
+    )
+    return {"copied": copied}
+
+if DEBUG_ENDPOINTS:
+    @router.get("/debug/pool")
+    def debug_pool():
+        return pool_stats()
+
+    @router.get("/debug/queries")
+    def debug_queries(limit: int = Query(20, ge=1, le=200)):
+        """Routes ranked by total DB time since startup"""
+        return profiler.route_stats.top(limit)
@@ -0,0 +1,223 @@
+# app/assets.py
+#
+# Static asset pipeline.
+#
+#   python -m app.assets build
+#
+# copies every file under app/static to STATIC_BUILD_DIR (default
+# app/static/build) with a content hash in its name (css/app.css ->
+# build/css/app.3f9a0c1e2b.css), writes a pre-compressed .gz (and .br when
+# the optional `brotli` package is installed) next to each text asset, and
+# records the mapping in build/manifest.json. Templates link assets with
+# {{ static_url("css/app.css") }}, which resolves through the manifest and
+# falls back to the plain path when there is no build.
+#
+# AssetFiles serves /static: a hashed file gets its .br / .gz variant when the
+# client accepts it, `Cache-Control: public, max-age=31536000, immutable` and
+# `Vary: Accept-Encoding`; anything else is revalidated (`no-cache`) via ETag.
+#
+# Front-proxy mode: SERVE_STATIC=0 leaves /static unmounted and STATIC_URL
+# (default /static) points the links at the proxy / CDN serving the build
+# directory, e.g. nginx `gzip_static on; brotli_static on;` with
+# `expires max; add_header Cache-Control immutable;` for the build location.
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.staticfiles import StaticFiles
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+STATIC_BUILD_DIR = os.getenv("STATIC_BUILD_DIR", os.path.join(STATIC_DIR, "build"))
+STATIC_URL = os.getenv("STATIC_URL", "/static").rstrip("/")
+SERVE_STATIC = os.getenv("SERVE_STATIC", "1").lower() in ("1", "true", "yes")
+
+MANIFEST = "manifest.json"
+HASH_LENGTH = 10
+# Compressing these gains nothing (already compressed) or too little to matter
+COMPRESSIBLE = {".css", ".js", ".mjs", ".map", ".json", ".svg", ".html", ".txt", ".xml", ".ico", ".ttf", ".otf"}
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_manifest = None
+
+
+def brotli_available():
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def hashed_name(relative_path, content):
+    root, ext = os.path.splitext(relative_path)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def _source_files(static_dir, build_dir):
+    build_dir = os.path.abspath(build_dir)
+    for root, dirs, files in os.walk(static_dir):
+        if os.path.abspath(root) == build_dir:
+            dirs[:] = []
+            continue
+        dirs[:] = [d for d in sorted(dirs) if os.path.abspath(os.path.join(root, d)) != build_dir]
+        for name in sorted(files):
+            if not name.startswith("."):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, static_dir).replace(os.sep, "/"), path
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def build(static_dir=STATIC_DIR, build_dir=STATIC_BUILD_DIR):
+    """Fingerprint and pre-compress every asset; returns per-file byte counts"""
+    use_brotli = brotli_available()
+    if use_brotli:
+        import brotli
+
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+    manifest, stats = {}, []
+    for relative_path, path in _source_files(static_dir, build_dir):
+        with open(path, "rb") as f:
+            content = f.read()
+        target = hashed_name(relative_path, content)
+        output = os.path.join(build_dir, target)
+        _write(output, content)
+        sizes = {"identity": len(content)}
+        if os.path.splitext(relative_path)[1].lower() in COMPRESSIBLE and len(content) >= MIN_COMPRESS_SIZE:
+            # mtime=0 keeps the .gz byte-identical across builds
+            compressed = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+            if use_brotli:
+                compressed["br"] = brotli.compress(content, quality=11)
+            for encoding, suffix in ENCODINGS:
+                data = compressed.get(encoding)
+                # Only keep a variant that is actually smaller
+                if data is not None and len(data) < len(content):
+                    _write(output + suffix, data)
+                    sizes[encoding] = len(data)
+        manifest[relative_path] = target
+        stats.append((relative_path, target, sizes))
+
+    _write(os.path.join(build_dir, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    reset_manifest()
+    return stats
+
+
+def load_manifest(build_dir=STATIC_BUILD_DIR):
+    """{source path: hashed path}, read once; empty when there is no build"""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(os.path.join(build_dir, MANIFEST)) as f:
+                _manifest = json.load(f)
+        except FileNotFoundError:
+            _manifest = {}
+    return _manifest
+
+
+def reset_manifest():
+    global _manifest
+    _manifest = None
+
+
+def static_url(path):
+    """URL of an asset, fingerprinted when the build has it"""
+    path = path.lstrip("/")
+    hashed = load_manifest().get(path)
+    if hashed is None:
+        return f"{STATIC_URL}/{path}"
+    build_prefix = os.path.relpath(STATIC_BUILD_DIR, STATIC_DIR).replace(os.sep, "/")
+    return f"{STATIC_URL}/{build_prefix}/{hashed}"
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class AssetFiles(StaticFiles):
+    """StaticFiles serving pre-compressed variants and immutable hashed assets"""
+
+    def __init__(self, *, directory=STATIC_DIR, build_dir=STATIC_BUILD_DIR, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        prefix = os.path.relpath(build_dir, directory).replace(os.sep, "/")
+        self.build_prefix = "" if prefix == "." else prefix + "/"
+
+    def is_fingerprinted(self, path):
+        return path.startswith(self.build_prefix) and not path.endswith(MANIFEST)
+
+    async def get_response(self, path, scope):
+        path = path.replace(os.sep, "/")
+        if not self.is_fingerprinted(path):
+            response = await super().get_response(path, scope)
+            response.headers.setdefault("cache-control", "no-cache")
+            return response
+
+        response = None
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                response = await super().get_response(path + suffix, scope)
+            except HTTPException:
+                continue
+            # The variant's own ETag (its stat) differs from the identity one
+            response.headers["content-encoding"] = encoding
+            if response.status_code == 200:
+                media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                if media_type.startswith("text/") or media_type in ("application/javascript", "image/svg+xml"):
+                    media_type += "; charset=utf-8"
+                response.headers["content-type"] = media_type
+            break
+        if response is None:
+            response = await super().get_response(path, scope)
+        response.headers["cache-control"] = IMMUTABLE
+        response.headers["vary"] = "Accept-Encoding"
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.assets")
+    parser.add_argument("command", choices=("build",))
+    parser.add_argument("--static-dir", default=STATIC_DIR)
+    parser.add_argument("--build-dir", default=STATIC_BUILD_DIR)
+    args = parser.parse_args()
+
+    stats = build(args.static_dir, args.build_dir)
+    totals = {"identity": 0, "gzip": 0, "br": 0}
+    for source, target, sizes in stats:
+        best = min(sizes.values())
+        for encoding in totals:
+            totals[encoding] += sizes.get(encoding, sizes.get("gzip", sizes["identity"]))
+        print(f"{source} -> {target}  {sizes['identity']} B -> {best} B")
+    print(f"{len(stats)} assets, {totals['identity']} B, gzip {totals['gzip']} B"
+          + (f", br {totals['br']} B" if brotli_available() else " (install brotli for .br)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# app/async_crud.py
+#
+# Async versions of the crud / budget / category query functions. Each one
+# runs the sync implementation on the AsyncSession's connection through
+# `AsyncSession.run_sync`, so the ORM code (and its caching / rollup upkeep)
+# is shared, while the event loop is released during every round trip.
+#
+# Call them with the session as a keyword argument: `await get_stats(user_id, db=db)`.
+
+import asyncio
+import functools
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import budget_overview_util, budget_utils, cache, category_utils, crud, dashboard_utils
+
+
+def run_in_session(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, db: AsyncSession, **kwargs):
+        return await db.run_sync(lambda session: fn(*args, db=session, **kwargs))
+    return wrapper
+
+
+# crud
+add_expense = run_in_session(crud.add_expense)
+get_transaction_by_id = run_in_session(crud.get_transaction_by_id)
+update_transaction = run_in_session(crud.update_transaction)
+delete_transaction = run_in_session(crud.delete_transaction)
+get_filtered_transactions = run_in_session(crud.get_filtered_transactions)
+get_transaction_page = run_in_session(crud.get_transaction_page)
+get_stats = run_in_session(crud.get_stats)
+get_pie_chart_data_filtered = run_in_session(crud.get_pie_chart_data_filtered)
+get_all_categories = run_in_session(crud.get_all_categories)
+get_categories = run_in_session(crud.get_categories)
+get_summary_by_period = run_in_session(crud.get_summary_by_period)
+get_chart_series = run_in_session(crud.get_chart_series)
+get_category_by_id = run_in_session(crud.get_category_by_id)
+add_category = run_in_session(crud.add_category)
+update_category = run_in_session(crud.update_category)
+delete_category = run_in_session(crud.delete_category)
+
+# budgets / categories / dashboard
+get_budget_progress = run_in_session(budget_utils.get_budget_progress)
+load_category_budgets = run_in_session(budget_overview_util.load_category_budgets)
+load_daily_spending = run_in_session(budget_overview_util.load_daily_spending)
+get_all_categories_with_budget = run_in_session(category_utils.get_all_categories_with_budget)
+upsert_category_budget = run_in_session(category_utils.upsert_category_budget)
+set_budgets = run_in_session(category_utils.set_budgets)
+set_budget_range = run_in_session(category_utils.set_budget_range)
+copy_budgets_forward = run_in_session(category_utils.copy_budgets_forward)
+get_dashboard_summary = run_in_session(dashboard_utils.get_dashboard_summary)
+
+# template fragment cache keys / conditional GET
+data_version = run_in_session(cache.data_version)
+fragment_version = run_in_session(cache.fragment_version)
+
+
+async def load_budget_overview(user_id, category_name, db: AsyncSession):
+    """The two budget overview loads run concurrently, the second on its own session"""
+    if not category_name:
+        categories = await load_category_budgets(user_id=user_id, db=db)
+        return budget_overview_util.build_budget_overview(categories, {})
+
+    async with AsyncSession(db.bind, expire_on_commit=False) as other:
+        if cache.cache is not None:
+            # Read the data version once; the second session's cache keys reuse it
+            await data_version(user_id=user_id, db=db)
+            other.sync_session.info["data_versions"] = dict(db.sync_session.info["data_versions"])
+        categories, daily = await asyncio.gather(
+            load_category_budgets(user_id=user_id, db=db),
+            load_daily_spending(user_id=user_id, category_name=category_name, db=other),
+        )
+    return budget_overview_util.build_budget_overview(categories, daily)
@@ -1,29 +1,24 @@
 # app/auth.py
 
 from fastapi import APIRouter, Request, Form, Depends, HTTPException, status, Response
-from sqlalchemy.orm import Session
-from passlib.hash import bcrypt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.responses import RedirectResponse
-from .database import SessionLocal
+from .database import get_async_db
+from .passwords import TooManyAttempts, hash_password, hashing_slot, verify_password
 from .models import User, Category
 from .default_categories import DEFAULT_CATEGORIES
-from fastapi.templating import Jinja2Templates
+from .templating import templates
 import re
 
-emplates = Jinja2Templates(directory="app/templates")
+router = APIRouter()
 
-templates = Jinja2Templates(directory="app/templates")
 
-router = APIRouter()
+TOO_MANY_ATTEMPTS = "Too many attempts in progress, please try again in a moment."
 
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
 
 
 def is_valid_email(email: str) -> bool:
@@ -38,12 +33,12 @@ def register_form(request: Request):
 
 
 @router.post("/register")
-def register(
+async def register(
     request: Request,
     name: str = Form(...),
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if not is_valid_email(email):
         return templates.TemplateResponse(
@@ -54,17 +49,24 @@ def register(
             },
         )
 
-    user = db.query(User).filter(User.email == email).first()
+    user = (await db.execute(select(User).filter(User.email == email))).scalars().first()
     if user:
         return templates.TemplateResponse(
             "register.html", {"request": request, "error": "Email already registered."}
         )
 
-    hashed_password = bcrypt.hash(password)
+    # bcrypt is CPU-bound: hashed on the password pool, limited per IP / email
+    try:
+        async with hashing_slot(client_ip(request), email):
+            hashed_password = await hash_password(password)
+    except TooManyAttempts:
+        return templates.TemplateResponse(
+            "register.html", {"request": request, "error": TOO_MANY_ATTEMPTS}, status_code=429
+        )
     new_user = User(name=name, email=email, password=hashed_password)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     # Add default categories for new user
     for cat in DEFAULT_CATEGORIES:
@@ -74,7 +76,7 @@ def register(
             user_id=new_user.id
         )
         db.add(category)
-    db.commit()
+    await db.commit()
 
     return RedirectResponse("/login", status_code=302)
 
@@ -85,19 +87,33 @@ def login_form(request: Request):
 
 
 @router.post("/login")
-def login(
+async def login(
     request: Request,
     response: Response,
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not bcrypt.verify(password, user.password):
+    user = (await db.execute(select(User).filter(User.email == email))).scalars().first()
+    valid, new_hash = False, None
+    if user:
+        try:
+            async with hashing_slot(client_ip(request), email):
+                valid, new_hash = await verify_password(password, user.password)
+        except TooManyAttempts:
+            return templates.TemplateResponse(
+                "login.html", {"request": request, "error": TOO_MANY_ATTEMPTS}, status_code=429
+            )
+    if not valid:
         return templates.TemplateResponse(
             "login.html", {"request": request, "error": "Invalid email or password."}
         )
 
+    # Stored hash used an older BCRYPT_ROUNDS: upgrade it transparently
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+
     request.session["user_id"] = user.id
     request.session["name"] = user.name
     return RedirectResponse("/dashboard", status_code=302)
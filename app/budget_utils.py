@@ -1,7 +1,9 @@
-from sqlalchemy import func, extract
 from datetime import date
-from app.models import Category, Expense, CategoryBudget
+from app.models import Category, CategoryBudget
+from app.rollup_utils import get_monthly_totals
+from app.cache import cached
 
+@cached
 def get_budget_progress(db, user_id):
     today = date.today()
     current_month = today.month
@@ -20,17 +22,9 @@ def get_budget_progress(db, user_id):
     ).all()
     budget_map = {b.category_id: b.budget for b in budgets}
 
-    # 3. Fetch expenses for current month
-    spending = db.query(
-        Expense.category_id,
-        func.sum(Expense.amount).label("spent")
-    ).filter(
-        Expense.user_id == user_id,
-        Expense.type == "expense",
-        extract('month', Expense.date) == current_month,
-        extract('year', Expense.date) == current_year
-    ).group_by(Expense.category_id).all()
-    spending_map = {row.category_id: row.spent for row in spending}
+    # 3. Fetch expenses for current month (from the monthly rollup)
+    totals = get_monthly_totals(db, user_id, (current_year, current_month))
+    spending_map = {category_id: spent for (category_id, _, _), spent in totals.items()}
 
     # 4. Merge to build progress data
     progress_data = []
@@ -0,0 +1,187 @@
+# app/cache.py
+#
+# Per-user memoization of aggregate queries. Entries are keyed by
+# (function, user_id, args, today, user's data version); every write path in
+# crud / category_utils bumps users.data_version in the same transaction, so
+# a cached aggregate is never served after the data behind it changed.
+#
+# CACHE_BACKEND=memory (default, in-process LRU) | redis (REDIS_URL) | none
+# CACHE_TTL seconds (default 300), CACHE_MAX_ENTRIES (memory backend, default 1024)
+
+import functools
+import inspect
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from sqlalchemy import update
+
+from .models import User
+
+
+class MemoryBackend:
+    """Thread-safe LRU with per-entry expiry"""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Shared cache in Redis (or any Redis-compatible server); needs the `redis` package"""
+
+    def __init__(self, url, ttl=300, prefix="expense-tracker:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.evictions = 0  # evictions happen server-side (see INFO stats)
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return False, None
+        return True, pickle.loads(raw)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(self.prefix + "*"))
+
+
+class AggregateCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        found, value = self.backend.get(key)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found, value
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def stats(self):
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "entries": len(self.backend),
+        }
+
+
+def _cache_from_env():
+    backend = os.getenv("CACHE_BACKEND", "memory")
+    ttl = int(os.getenv("CACHE_TTL", "300"))
+    if backend == "none":
+        return None
+    if backend == "redis":
+        return AggregateCache(RedisBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"), ttl))
+    return AggregateCache(MemoryBackend(int(os.getenv("CACHE_MAX_ENTRIES", "1024")), ttl))
+
+
+cache = _cache_from_env()
+
+
+def configure(new_cache):
+    """Swap the cache (or None to disable it), e.g. for benchmarks"""
+    global cache
+    cache = new_cache
+
+
+def cache_stats():
+    return cache.stats() if cache else {}
+
+
+def data_version(db, user_id):
+    """The user's data version, read once per session"""
+    versions = db.info.setdefault("data_versions", {})
+    if user_id not in versions:
+        versions[user_id] = db.query(User.data_version).filter(User.id == user_id).scalar() or 0
+    return versions[user_id]
+
+
+def fragment_version(db, user_id):
+    """data_version for template fragment keys; None (render uncached) when caching is off"""
+    return data_version(db, user_id) if cache else None
+
+
+def bump_data_version(db, user_id):
+    """Invalidate the user's cached aggregates; call inside the write's transaction"""
+    db.execute(update(User).where(User.id == user_id).values(data_version=User.data_version + 1))
+    db.info.get("data_versions", {}).pop(user_id, None)
+
+
+def cached(fn):
+    """Memoize an aggregate `fn(..., user_id, ..., db)` returning plain data (no ORM objects)"""
+    signature = inspect.signature(fn)
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if cache is None:
+            return fn(*args, **kwargs)
+
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        db = arguments.pop("db")
+        user_id = arguments["user_id"]
+        # today is part of the key: "current month" results change at midnight
+        key = f"{name}:{user_id}:{data_version(db, user_id)}:{date.today()}:{sorted(arguments.items())!r}"
+
+        found, value = cache.get(key)
+        if found:
+            return value
+        value = fn(*args, **kwargs)
+        cache.set(key, value)
+        return value
+
+    return wrapper
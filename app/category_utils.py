@@ -1,6 +1,13 @@
 from datetime import date
+from sqlalchemy import literal, select
 from sqlalchemy.orm import Session
 from app.models import Category, CategoryBudget
+from app.cache import bump_data_version
+from app.date_utils import next_month, previous_month
+from app.db_utils import dialect_insert
+
+budgets_table = CategoryBudget.__table__
+BUDGET_KEY = ["user_id", "category_id", "year", "month"]
 
 
 def get_all_categories_with_budget(db: Session, user_id: int):
@@ -28,24 +35,79 @@ def get_all_categories_with_budget(db: Session, user_id: int):
 def upsert_category_budget(db: Session, category_id: int, user_id: int, budget: float):
     """Insert or update the budget for the current month"""
     today = date.today()
-    current_month, current_year = today.month, today.year
+    set_budgets(db, user_id, [(category_id, today.year, today.month, budget)])
+
+
+def month_range(first, last):
+    """(year, month) pairs from first to last, inclusive"""
+    current = first
+    while current <= last:
+        yield current
+        current = next_month(*current)
+
+
+def _check_categories(db: Session, user_id: int, category_ids):
+    """Budgets may be set on the user's own and the default categories only"""
+    ids = set(category_ids)
+    visible = {id for (id,) in db.query(Category.id).filter(
+        Category.id.in_(ids), (Category.user_id == user_id) | (Category.user_id == None)
+    )}
+    if ids - visible:
+        raise ValueError(f"unknown categories {sorted(ids - visible)}")
+
+
+def set_budgets(db: Session, user_id: int, budgets):
+    """Upsert (category_id, year, month, budget) rows in one INSERT ... ON CONFLICT statement"""
+    rows = {
+        (category_id, year, month): {"user_id": user_id, "category_id": category_id, "year": year,
+                                     "month": month, "budget": budget}
+        for category_id, year, month, budget in budgets
+    }
+    if not rows:
+        return 0
+    _check_categories(db, user_id, {row["category_id"] for row in rows.values()})
+    stmt = dialect_insert(db, budgets_table)
+    stmt = stmt.on_conflict_do_update(index_elements=BUDGET_KEY, set_={"budget": stmt.excluded.budget})
+    db.execute(stmt, list(rows.values()))
+    bump_data_version(db, user_id)
+    db.commit()
+    return len(rows)
+
+
+def set_budget_range(db: Session, user_id: int, budgets: dict, first, last):
+    """{category_id: budget} for every month from first to last (year, month), one statement"""
+    months = list(month_range(first, last))
+    return set_budgets(db, user_id, [
+        (category_id, year, month, budget) for category_id, budget in budgets.items() for year, month in months
+    ])
+
 
-    existing = db.query(CategoryBudget).filter_by(
-        category_id=category_id,
-        user_id=user_id,
-        month=current_month,
-        year=current_year
-    ).first()
+def copy_budgets_forward(db: Session, user_id: int, target=None, source=None, overwrite=False):
+    """Copy the source month's budgets (default: the month before target) into target
+    (default: this month) with one INSERT ... SELECT; existing target budgets are kept
+    unless overwrite"""
+    if target is None:
+        today = date.today()
+        target = (today.year, today.month)
+    source = source or previous_month(*target)
 
-    if existing:
-        existing.budget = budget
+    stmt = dialect_insert(db, budgets_table).from_select(
+        ["user_id", "category_id", "year", "month", "budget"],
+        select(
+            budgets_table.c.user_id, budgets_table.c.category_id,
+            literal(target[0]), literal(target[1]), budgets_table.c.budget,
+        ).where(
+            budgets_table.c.user_id == user_id,
+            budgets_table.c.year == source[0],
+            budgets_table.c.month == source[1],
+        ),
+    )
+    if overwrite:
+        stmt = stmt.on_conflict_do_update(index_elements=BUDGET_KEY, set_={"budget": stmt.excluded.budget})
     else:
-        new = CategoryBudget(
-            category_id=category_id,
-            user_id=user_id,
-            month=current_month,
-            year=current_year,
-            budget=budget
-        )
-        db.add(new)
+        stmt = stmt.on_conflict_do_nothing(index_elements=BUDGET_KEY)
+    copied = db.execute(stmt).rowcount
+    if copied:
+        bump_data_version(db, user_id)
     db.commit()
+    return copied
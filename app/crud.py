@@ -1,9 +1,12 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager, joinedload
 from .models import Expense, Category
-from sqlalchemy import  func, case
-from datetime import datetime, timedelta
+from sqlalchemy import  func, select, tuple_
+from datetime import date
 from app.models import Expense
 from .models import CategoryBudget
+from .rollup_utils import all_time_total, apply_deltas, transaction_delta
+from .cache import bump_data_version, cached
+from .category_utils import set_budgets
 from app import models
 
 def add_expense(user_id: int, date, category_id: int, amount: float, description: str, type: str, db: Session):
@@ -16,53 +19,116 @@ def add_expense(user_id: int, date, category_id: int, amount: float, description
         type=type
     )
     db.add(expense)
+    apply_deltas(db, [transaction_delta(user_id, category_id, date, type, amount)])
+    bump_data_version(db, user_id)
     db.commit()
 
 def get_transaction_by_id(db: Session, txn_id: int, user_id: int):
-    return db.query(Expense).filter(Expense.id == txn_id, Expense.user_id == user_id).first()
+    return db.query(Expense).options(joinedload(Expense.category)).filter(
+        Expense.id == txn_id, Expense.user_id == user_id
+    ).first()
 
 def update_transaction(db: Session, txn_id: int, date, type, category_id, amount, description):
     txn = db.query(models.Expense).filter(models.Expense.id == txn_id).first()
     if txn:
+        deltas = [
+            transaction_delta(txn.user_id, txn.category_id, txn.date, txn.type, txn.amount, sign=-1),
+            transaction_delta(txn.user_id, category_id, date, type, amount),
+        ]
         txn.date = date
         txn.type = type
         txn.category_id = category_id
         txn.amount = amount
         txn.description = description
+        apply_deltas(db, deltas)
+        bump_data_version(db, txn.user_id)
         db.commit()
         
 def delete_transaction(db: Session, txn_id: int):
     txn = db.query(models.Expense).filter(models.Expense.id == txn_id).first()
     if txn:
         db.delete(txn)
+        apply_deltas(db, [transaction_delta(txn.user_id, txn.category_id, txn.date, txn.type, txn.amount, sign=-1)])
+        bump_data_version(db, txn.user_id)
         db.commit()
 
 
 
-def get_filtered_transactions(user_id: int, type: str, from_date, to_date, db: Session):
-    query = db.query(Expense).filter(
-        Expense.user_id == user_id,
-        Expense.date >= from_date,
-        Expense.date <= to_date
-    ).join(Category)
+def filter_transactions(query, user_id: int, type: str = None, from_date=None, to_date=None, category=None):
+    """Apply the common transaction filters; `query` must already be joined to Category.
 
+    `category` is a Category.id (int) or a category name (str).
+    """
+    query = query.filter(Expense.user_id == user_id)
+    if from_date:
+        query = query.filter(Expense.date >= from_date)
+    if to_date:
+        query = query.filter(Expense.date <= to_date)
     if type in ["income", "expense"]:
         query = query.filter(Expense.type == type)
+    if isinstance(category, int):
+        query = query.filter(Expense.category_id == category)
+    elif category:
+        query = query.filter(Category.name == category)
+    return query
 
-    return query.order_by(Expense.date.desc()).all()
 
-def get_stats(user_id: int, db: Session):
-    income = db.query(func.coalesce(func.sum(Expense.amount), 0)).filter(
-        Expense.user_id == user_id, Expense.type == "income"
-    ).scalar()
+# Keyset pagination cursor: "<date>:<id>" of the last row on the previous page
+def encode_cursor(txn) -> str:
+    return f"{txn.date.isoformat()}:{txn.id}"
 
-    expense = db.query(func.coalesce(func.sum(Expense.amount), 0)).filter(
-        Expense.user_id == user_id, Expense.type == "expense"
-    ).scalar()
+def decode_cursor(cursor: str):
+    try:
+        day, txn_id = cursor.split(":")
+        return date.fromisoformat(day), int(txn_id)
+    except (AttributeError, ValueError):
+        return None
 
+def after_cursor(query, cursor):
+    """Rows strictly after `cursor` in (date DESC, id DESC) order"""
+    last_date, last_id = cursor
+    return query.filter(tuple_(Expense.date, Expense.id) < tuple_(last_date, last_id))
+
+
+def get_filtered_transactions(user_id: int, type: str, from_date, to_date, db: Session,
+                              category=None, cursor=None, limit: int = None):
+    query = filter_transactions(
+        db.query(Expense).join(Category).options(contains_eager(Expense.category)),
+        user_id, type, from_date, to_date, category
+    )
+    if cursor:
+        query = after_cursor(query, cursor)
+
+    query = query.order_by(Expense.date.desc(), Expense.id.desc())
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+def get_transaction_page(user_id: int, db: Session, type: str = None, from_date=None, to_date=None,
+                         category=None, cursor=None, limit: int = 50):
+    """Column projection of one keyset page, for the JSON API"""
+    query = filter_transactions(
+        db.query(
+            Expense.id, Expense.date, Expense.type, Expense.amount, Expense.description,
+            Expense.category_id, Category.name.label("category"),
+        ).join(Category),
+        user_id, type, from_date, to_date, category
+    )
+    if cursor:
+        query = after_cursor(query, cursor)
+    return query.order_by(Expense.date.desc(), Expense.id.desc()).limit(limit).all()
+
+@cached
+def get_stats(user_id: int, db: Session):
+    # All-time totals from the monthly rollup (O(categories x months)) plus
+    # uncategorized expenses, in one statement
+    income, expense = db.execute(select(
+        all_time_total(user_id, "income"), all_time_total(user_id, "expense")
+    )).one()
     profit = income - expense
     return income, expense, profit
 
+@cached
 def get_pie_chart_data_filtered(user_id: int, type: str, from_date, to_date, db: Session):
     results = db.query(Category.name, func.sum(Expense.amount)).join(Category).filter(
         Expense.user_id == user_id,
@@ -82,52 +148,46 @@ def get_all_categories(user_id: int, db: Session):
 def create_category(name: str, type: str, budget: float, user_id: int, db: Session):
     category = Category(name=name, type=type, budget=budget, user_id=user_id)
     db.add(category)
+    bump_data_version(db, user_id)
     db.commit()
 
 def get_categories(db: Session, user_id: int):
     return db.query(Category).filter(Category.user_id == user_id).all()
 
-def get_summary_by_period(user_id: int, period: str, category: str, db: Session):
-    today = datetime.today().date()
-
-    if period == "year":
-        label_format = 'YYYY'
-        start_date = today.replace(year=today.year - 4, month=1, day=1)
-
-    elif period == "month":
-        label_format = 'Mon'
-        month = today.month
-        year = today.year
-        if month <= 5:
-            year -= 1
-            month += 12
-        start_date = datetime(year, month - 4, 1).date()
-
-    elif period == "week":
-        label_format = 'YYYY-MM-DD'   # week label = start of week
-        start_date = today - timedelta(weeks=4)
-
-    elif period == "day":
-        label_format = 'YYYY-MM-DD'   # exact dates for last 5 days
-        start_date = today - timedelta(days=4)
-
-    else:
-        label_format = 'Mon'
-        start_date = today - timedelta(days=30)
-
-    query = db.query(
-        func.to_char(Expense.date, label_format).label("label"),
-        func.sum(case((Expense.type == "income", Expense.amount), else_=0)).label("income"),
-        func.sum(case((Expense.type == "expense", Expense.amount), else_=0)).label("expense")
-    ).join(Category).filter(
-        Expense.user_id == user_id,
-        Expense.date >= start_date
-    )
-
-    if category:
-        query = query.filter(Category.name == category)
-
-    return query.group_by("label").order_by("label").limit(5).all()
+@cached
+def get_summary_by_period(user_id: int, period: str, category: str, db: Session,
+                          periods: int = 5, from_date=None, to_date=None):
+    """Chart series for the last `periods` buckets (or from_date..to_date) as plain lists"""
+    # timeseries pulls in NumPy: loaded by the first chart request, not at boot
+    from . import timeseries
+
+    if from_date is None or to_date is None:
+        default_from, default_to = timeseries.last_periods(period, periods, to_date)
+        from_date, to_date = from_date or default_from, to_date or default_to
+
+    series = timeseries.get_series(db, user_id, period, from_date, to_date, category=category)
+    return {
+        "labels": timeseries.format_labels(series["starts"], period),
+        **{name: series[name].tolist() for name in ("income", "expense", "profit", "loss")},
+    }
+
+@cached
+def get_chart_series(user_id: int, granularity: str, from_date, to_date, db: Session,
+                     type: str = None, category: str = None, max_points: int = None, method: str = "lttb"):
+    """Columnar series for /api/series: parallel bucket-start and amount arrays"""
+    from . import timeseries
+
+    series = timeseries.get_series(db, user_id, granularity, from_date, to_date, type=type, category=category)
+    points = len(series["starts"])
+    if max_points:
+        series = timeseries.downsample(series, max_points, method, signal=type or "net")
+    return {
+        "granularity": granularity,
+        "points": points,
+        "downsampled": len(series["starts"]) < points,
+        "t": timeseries.format_labels(series["starts"], "day"),
+        **{name: series[name].round(2).tolist() for name in ("income", "expense", "profit", "loss")},
+    }
 
 #for categories page
 # Get category by ID
@@ -138,6 +198,7 @@ def get_category_by_id(db: Session, category_id: int):
 def add_category(db: Session, user_id: int, name: str, type: str, budget: float = None):
     new_cat = Category(name=name, type=type, budget=budget, user_id=user_id)
     db.add(new_cat)
+    bump_data_version(db, user_id)
     db.commit()
     db.refresh(new_cat)
     return new_cat
@@ -152,11 +213,13 @@ def update_category(db: Session, category_id: int, user_id: int, name: str, budg
         existing = db.query(Category).filter_by(name=name, type=category.type, user_id=user_id).first()
         if existing:
             existing.budget = budget
+            bump_data_version(db, user_id)
             db.commit()
             return existing
         # Otherwise create a new personal copy
         new_cat = Category(name=name, type=category.type, budget=budget, user_id=user_id)
         db.add(new_cat)
+        bump_data_version(db, user_id)
         db.commit()
         db.refresh(new_cat)
         return new_cat
@@ -165,6 +228,7 @@ def update_category(db: Session, category_id: int, user_id: int, name: str, budg
     if category.user_id == user_id:
         category.name = name
         category.budget = budget
+        bump_data_version(db, user_id)
         db.commit()
         return category
     return None
@@ -174,38 +238,23 @@ def delete_category(db: Session, category_id: int, user_id: int):
     category = get_category_by_id(db, category_id)
     if category and category.user_id == user_id:
         db.delete(category)
+        bump_data_version(db, user_id)
         db.commit()
         return True
     return False
 
    
 # Set or update monthly budget for a category
-def set_or_update_monthly_budget(db: Session, category_id: int, user_id: int, month: str, amount: float):
-    budget = db.query(CategoryBudget).filter_by(
-        category_id=category_id,
-        user_id=user_id,
-        month=month
-    ).first()
-
-    if budget:
-        budget.amount = amount
-    else:
-        budget = CategoryBudget(
-            category_id=category_id,
-            user_id=user_id,
-            month=month,
-            amount=amount
-        )
-        db.add(budget)
-    
-    db.commit()
+def set_or_update_monthly_budget(db: Session, category_id: int, user_id: int, year: int, month: int, amount: float):
+    set_budgets(db, user_id, [(category_id, year, month, amount)])
 
 
 # Get budget for a specific category + month
-def get_budget_for_category_month(db: Session, category_id: int, user_id: int, month: str):
+def get_budget_for_category_month(db: Session, category_id: int, user_id: int, year: int, month: int):
     return db.query(CategoryBudget).filter_by(
         category_id=category_id,
         user_id=user_id,
+        year=year,
         month=month
     ).first()
 
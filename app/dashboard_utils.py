@@ -0,0 +1,70 @@
+from datetime import date
+from sqlalchemy import and_, func
+from app.models import Category, Expense, CategoryBudget, MonthlyCategoryTotal
+from app.cache import cached
+from app.rollup_utils import all_time_total
+
+
+@cached
+def get_dashboard_summary(db, user_id, type, from_date, to_date):
+    """Totals, pie chart, budget progress and category list for the dashboard in two queries"""
+    today = date.today()
+
+    # 1. Pie chart: selected-period totals per category name
+    pie = {}
+    if type in ["income", "expense"]:
+        pie = dict(db.query(Category.name, func.sum(Expense.amount)).join(Category).filter(
+            Expense.user_id == user_id,
+            Expense.type == type,
+            Expense.date >= from_date,
+            Expense.date <= to_date
+        ).group_by(Category.name).all())
+
+    # 2. Categories (default + user-defined) with this month's budget and
+    #    spending from the monthly rollup, plus all-time totals
+    categories = db.query(
+        Category.id, Category.name, Category.type, Category.user_id,
+        CategoryBudget.budget,
+        MonthlyCategoryTotal.total.label("spent"),
+        all_time_total(user_id, "income").label("income_total"),
+        all_time_total(user_id, "expense").label("expense_total"),
+    ).outerjoin(CategoryBudget, and_(
+        CategoryBudget.category_id == Category.id,
+        CategoryBudget.user_id == user_id,
+        CategoryBudget.year == today.year,
+        CategoryBudget.month == today.month,
+    )).outerjoin(MonthlyCategoryTotal, and_(
+        MonthlyCategoryTotal.category_id == Category.id,
+        MonthlyCategoryTotal.user_id == user_id,
+        MonthlyCategoryTotal.year == today.year,
+        MonthlyCategoryTotal.month == today.month,
+        MonthlyCategoryTotal.type == "expense",
+    )).filter(
+        (Category.user_id == user_id) | (Category.user_id == None)
+    ).all()
+
+    # The totals repeat on every row; the default categories guarantee one
+    income = categories[0].income_total if categories else 0
+    expense = categories[0].expense_total if categories else 0
+
+    progress_data = []
+    for cat in categories:
+        if cat.budget is not None:  # Show only categories with budget set
+            spent = cat.spent or 0
+            percent = round((spent / cat.budget) * 100, 2) if cat.budget else 0
+            progress_data.append({
+                "category": cat.name,
+                "spent": spent,
+                "budget": cat.budget,
+                "percent": percent
+            })
+
+    return {
+        "income": income,
+        "expense": expense,
+        "profit": income - expense,
+        "labels": list(pie.keys()),
+        "values": list(pie.values()),
+        "progress_data": progress_data,
+        "all_categories": [cat for cat in categories if cat.user_id == user_id],
+    }
@@ -1,24 +1,255 @@
 # app/database.py
+#
+# Engine configuration (all optional, from the environment):
+#   DB_POOL_SIZE (5), DB_MAX_OVERFLOW (10), DB_POOL_TIMEOUT seconds (30),
+#   DB_POOL_RECYCLE seconds (1800), DB_POOL_PRE_PING (1),
+#   DB_NULLPOOL (0) - no app-side pooling, for running behind PgBouncer,
+#   DB_STATEMENT_TIMEOUT_MS (0 = off) - Postgres statement_timeout.
+#
+# Read replica (optional): REPLICA_DATABASE_URL. Read-only handlers use
+# get_read_db / get_async_read_db; after any write the browser session is
+# pinned to the primary for READ_PIN_SECONDS (5) so redirects read their writes.
+#
+# Engines are created on first use (init_engines, or any `database.engine` /
+# `from .database import SessionLocal`), not at import, so importing the app
+# loads no DB driver and opens no connection.
 
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from dotenv import load_dotenv
 import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from .pool_metrics import PoolMetrics
 
 load_dotenv()  # Load environment variables from .env
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+READ_PIN_SECONDS = float(os.getenv("READ_PIN_SECONDS", "5"))
+
+
+def async_url(url: str) -> str:
+    """Async driver URL for DATABASE_URL: asyncpg for Postgres, aiosqlite for SQLite"""
+    scheme, rest = url.split("://", 1)
+    if scheme.startswith("postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    # In-memory SQLite uses SingletonThreadPool, which takes no pool size arguments
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(url: str, is_async: bool = False, **overrides):
+    """create_engine / create_async_engine keyword arguments from the environment"""
+    options = {"pool_pre_ping": _env_flag("DB_POOL_PRE_PING", "1")}
+    connect_args = {}
+    is_postgres = url.startswith("postgres")
+
+    if _env_flag("DB_NULLPOOL", "0"):
+        options["poolclass"] = NullPool
+        if is_postgres and is_async:
+            # PgBouncer in transaction mode cannot keep prepared statements
+            connect_args["statement_cache_size"] = 0
+    elif not _is_memory_sqlite(url):
+        options.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        )
+
+    statement_timeout = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    if statement_timeout and is_postgres:
+        if is_async:
+            connect_args["server_settings"] = {"statement_timeout": str(statement_timeout)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={statement_timeout}"
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    options.update(overrides)
+    return options
+
+
+def make_engine(url: str = DATABASE_URL, **overrides):
+    return create_engine(url, **engine_options(url, **overrides))
+
+
+def make_async_engine(url: str = DATABASE_URL, **overrides):
+    return create_async_engine(async_url(url), **engine_options(url, is_async=True, **overrides))
+
+
+ENGINE_NAMES = (
+    "engine", "SessionLocal", "async_engine", "AsyncSessionLocal", "pool_metrics",
+    "replica_engine", "async_replica_engine", "ReplicaSessionLocal", "AsyncReplicaSessionLocal",
+)
+_engines_lock = threading.Lock()
+
+
+def _create_engines():
+    # Sync engine: migrations, CLIs, streaming export / bulk import
+    engine = make_engine()
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    # Async engine: request handlers
+    async_engine = make_async_engine()
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    pool_metrics = {
+        "sync": PoolMetrics("sync", engine),
+        "async": PoolMetrics("async", async_engine.sync_engine),
+    }
+
+    # Replica engines fall back to the primary when no replica is configured
+    if REPLICA_DATABASE_URL:
+        replica_engine = make_engine(REPLICA_DATABASE_URL)
+        async_replica_engine = make_async_engine(REPLICA_DATABASE_URL)
+        ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+        AsyncReplicaSessionLocal = async_sessionmaker(
+            async_replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+        pool_metrics["replica"] = PoolMetrics("replica", replica_engine)
+        pool_metrics["async_replica"] = PoolMetrics("async_replica", async_replica_engine.sync_engine)
+    else:
+        replica_engine, async_replica_engine = engine, async_engine
+        ReplicaSessionLocal, AsyncReplicaSessionLocal = SessionLocal, AsyncSessionLocal
+
+    return {name: value for name, value in locals().items() if name in ENGINE_NAMES}
+
+
+def init_engines():
+    """Create the engines and session factories (once); importing this module does not"""
+    if "engine" not in globals():
+        with _engines_lock:
+            if "engine" not in globals():
+                globals().update(_create_engines())
+
+
+def __getattr__(name):
+    # `database.engine`, `from .database import SessionLocal`, ... create them on first use
+    if name in ENGINE_NAMES:
+        init_engines()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def dispose_engines():
+    """Close every pooled connection (server shutdown)"""
+    if "engine" in globals():
+        for target in {engine, replica_engine}:
+            target.dispose()
+        for target in {async_engine, async_replica_engine}:
+            await target.dispose()
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
+def pin_primary(request):
+    """Route this browser session's reads to the primary for READ_PIN_SECONDS"""
+    request.session["primary_until"] = time.time() + READ_PIN_SECONDS
+
+
+def is_pinned(request):
+    return request.session.get("primary_until", 0) > time.time()
+
+
+def read_session_factory(request):
+    """SessionLocal or ReplicaSessionLocal for a read-only handler"""
+    init_engines()
+    if REPLICA_DATABASE_URL and not is_pinned(request):
+        return ReplicaSessionLocal
+    return SessionLocal
+
+
+@contextmanager
+def _open_session(factory, metrics):
+    db = factory()
     try:
+        # Check out the connection up front so pool waits / timeouts are measured
+        with metrics.timed_checkout():
+            db.connection()
         yield db
     finally:
         db.close()
+
+
+@asynccontextmanager
+async def _open_async_session(factory, metrics):
+    async with factory() as db:
+        with metrics.timed_checkout():
+            await db.connection()
+        yield db
+
+
+def get_db():
+    init_engines()
+    with _open_session(SessionLocal, pool_metrics["sync"]) as db:
+        yield db
+
+
+async def get_async_db():
+    init_engines()
+    async with _open_async_session(AsyncSessionLocal, pool_metrics["async"]) as db:
+        yield db
+
+
+def get_write_db(request: Request):
+    """Primary session for a handler that writes; pins the session's reads"""
+    pin_primary(request)
+    init_engines()
+    with _open_session(SessionLocal, pool_metrics["sync"]) as db:
+        yield db
+
+
+async def get_async_write_db(request: Request):
+    pin_primary(request)
+    init_engines()
+    async with _open_async_session(AsyncSessionLocal, pool_metrics["async"]) as db:
+        yield db
+
+
+def get_read_db(request: Request):
+    """Replica session for a read-only handler, primary while pinned"""
+    if read_session_factory(request) is SessionLocal:
+        factory, metrics = SessionLocal, pool_metrics["sync"]
+    else:
+        factory, metrics = ReplicaSessionLocal, pool_metrics["replica"]
+    with _open_session(factory, metrics) as db:
+        yield db
+
+
+@asynccontextmanager
+async def async_read_session(request: Request):
+    """AsyncSession for reads outside a dependency (replica, primary while pinned)"""
+    if read_session_factory(request) is SessionLocal:
+        factory, metrics = AsyncSessionLocal, pool_metrics["async"]
+    else:
+        factory, metrics = AsyncReplicaSessionLocal, pool_metrics["async_replica"]
+    async with _open_async_session(factory, metrics) as db:
+        yield db
+
+
+async def get_async_read_db(request: Request):
+    async with async_read_session(request) as db:
+        yield db
+
+
+def pool_stats():
+    init_engines()
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
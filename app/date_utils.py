@@ -0,0 +1,32 @@
+# app/date_utils.py
+
+from datetime import date
+from sqlalchemy import and_, or_
+
+
+def previous_month(year: int, month: int):
+    return (year - 1, 12) if month == 1 else (year, month - 1)
+
+
+def next_month(year: int, month: int):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def month_bounds(year: int, month: int):
+    """Half-open [start, end) date range covering one calendar month"""
+    return date(year, month, 1), date(*next_month(year, month), 1)
+
+
+def month_window(column, *months):
+    """Sargable predicate matching `column` in any of the given (year, month) pairs.
+
+    Adjacent months are merged into a single `column >= start AND column < end`
+    range, so e.g. (prev month, this month) becomes one index range scan.
+    """
+    ranges = []
+    for start, end in sorted(month_bounds(y, m) for y, m in set(months)):
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return or_(*[and_(column >= start, column < end) for start, end in ranges])
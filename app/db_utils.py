@@ -0,0 +1,11 @@
+def dialect_insert(db, table):
+    """`insert(table)` for the session's dialect, with `.on_conflict_do_update()` support"""
+    # Dialect modules are imported here: only the one in use is ever loaded
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table)
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table)
+    raise NotImplementedError(f"INSERT ... ON CONFLICT is not supported on {name}")
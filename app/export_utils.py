@@ -0,0 +1,149 @@
+import csv
+import json
+import tempfile
+import zlib
+from io import StringIO
+from app import crud, database
+from app.models import Category, Expense
+
+EXPORT_COLUMNS = ["Date", "Type", "Category", "Amount", "Description"]
+
+# format -> (media type, download filename)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "transactions.csv"),
+    "csv.gz": ("application/gzip", "transactions.csv.gz"),
+    "ndjson": ("application/x-ndjson", "transactions.ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "transactions.parquet"),
+}
+
+
+def iter_transaction_rows(user_id, type=None, from_date=None, to_date=None, category=None, batch_size=1000,
+                          session_factory=None):
+    """Stream (date, type, category, amount, description) rows through a server-side cursor.
+
+    Opens its own session (from `session_factory`, SessionLocal by default, or the
+    replica's) so it can outlive the request dependency while the response body
+    is being sent.
+    """
+    db = (session_factory or database.SessionLocal)()
+    try:
+        query = crud.filter_transactions(
+            db.query(
+                Expense.date, Expense.type, Category.name.label("category"),
+                Expense.amount, Expense.description
+            ).join(Category),
+            user_id, type, from_date, to_date, category
+        ).order_by(Expense.date.desc(), Expense.id.desc())
+
+        for row in query.yield_per(batch_size):
+            yield row
+    finally:
+        db.close()
+
+
+def iter_csv(rows, chunk_rows=1000):
+    """Encode rows as CSV, yielding a chunk of text every `chunk_rows` rows"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending == chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def iter_gzip(chunks, level=6):
+    """Gzip a stream of text chunks incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_ndjson(rows, chunk_rows=1000):
+    """One JSON object per line, yielded in chunks of `chunk_rows` lines"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({
+            "date": row.date.isoformat(),
+            "type": row.type,
+            "category": row.category,
+            "amount": row.amount,
+            "description": row.description,
+        }))
+        if len(lines) == chunk_rows:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def iter_parquet(rows, row_group_rows=65536, read_size=1 << 20):
+    """Write rows to Parquet one row group per batch, then stream the file.
+
+    Parquet needs its footer written last, so the file is assembled in a
+    spooled temporary file (in memory up to 32 MB) before being sent.
+    Requires the optional `pyarrow` dependency.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("date", pa.date32()),
+        ("type", pa.string()),
+        ("category", pa.string()),
+        ("amount", pa.float64()),
+        ("description", pa.string()),
+    ])
+
+    with tempfile.SpooledTemporaryFile(max_size=32 << 20) as sink:
+        with pq.ParquetWriter(sink, schema, compression="snappy") as writer:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == row_group_rows:
+                    writer.write_table(_arrow_table(pa, schema, batch))
+                    batch = []
+            if batch:
+                writer.write_table(_arrow_table(pa, schema, batch))
+
+        sink.seek(0)
+        while True:
+            data = sink.read(read_size)
+            if not data:
+                break
+            yield data
+
+
+def _arrow_table(pa, schema, batch):
+    columns = list(zip(*batch))
+    return pa.Table.from_arrays([pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema)
+
+
+def encode_export(fmt, rows):
+    """Body iterator for one of EXPORT_FORMATS"""
+    if fmt == "csv":
+        return iter_csv(rows)
+    if fmt == "csv.gz":
+        return iter_gzip(iter_csv(rows))
+    if fmt == "ndjson":
+        return iter_ndjson(rows)
+    if fmt == "parquet":
+        return iter_parquet(rows)
+    raise ValueError(f"Unknown export format: {fmt}")
@@ -0,0 +1,176 @@
+# app/http_cache.py
+#
+# Response compression and conditional GET for the HTML pages and JSON API.
+#
+# CompressionMiddleware: brotli (when the optional `brotli` package is
+# installed and the client accepts it) or gzip for responses of at least
+# COMPRESS_MIN_SIZE bytes (1024). GZIP_LEVEL (6) / BROTLI_QUALITY (4) trade
+# ratio for CPU on per-request compression; /static and already-compressed
+# content types are passed through (app/assets.py pre-compresses assets).
+#
+# ConditionalGetMiddleware: a logged-in GET to one of CONDITIONAL_PATHS gets
+# a weak ETag derived from the user's data_version (bumped by every write in
+# crud / category_utils / import_utils), the path and query, today's date and
+# the deployed code and templates. A matching If-None-Match is answered 304
+# after one primary-key read of users.data_version, before the handler (and
+# its aggregate queries) runs. Pages are marked `private, no-cache`, so the
+# browser revalidates on every view and never shows data older than a write.
+#
+# COMPRESS_RESPONSES=0 / CONDITIONAL_GET=0 turn either off.
+
+import hashlib
+import os
+from datetime import date
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder, IdentityResponder
+from starlette.requests import Request
+
+from . import async_crud, database
+from .assets import accepted_encodings, brotli_available
+
+COMPRESS_RESPONSES = os.getenv("COMPRESS_RESPONSES", "1").lower() in ("1", "true", "yes")
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+CONDITIONAL_GET = os.getenv("CONDITIONAL_GET", "1").lower() in ("1", "true", "yes")
+CONDITIONAL_PATHS = tuple(os.getenv(
+    "CONDITIONAL_PATHS", "/dashboard,/charts,/categories,/budget_overview,/api/transactions,/api/series"
+).split(","))
+
+UNCOMPRESSED_PATHS = ("/static/",)
+INCOMPRESSIBLE_TYPES = (
+    "text/event-stream", "image/", "audio/", "video/", "font/woff",
+    "application/gzip", "application/zip", "application/octet-stream", "application/vnd.apache.parquet",
+)
+CACHE_CONTROL = "private, no-cache"
+APP_DIR = os.path.dirname(__file__)
+
+
+class _SkipIncompressible:
+    async def send_with_compression(self, message):
+        await super().send_with_compression(message)
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            length = headers.get("content-length")
+            # BaseHTTPMiddleware re-sends every body as a stream, which would
+            # defeat the size threshold; the declared length still applies
+            small = length is not None and length.isdigit() and int(length) < self.minimum_size
+            incompressible = headers.get("content-type", "").startswith(INCOMPRESSIBLE_TYPES)
+            self.content_type_is_excluded = self.content_type_is_excluded or small or incompressible
+
+
+class GzipResponder(_SkipIncompressible, GZipResponder):
+    pass
+
+
+class BrotliResponder(_SkipIncompressible, IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size, quality=BROTLI_QUALITY):
+        import brotli
+
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body, *, more_body):
+        body = self.compressor.process(body)
+        return body + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware that prefers brotli and skips static / binary responses"""
+
+    def __init__(self, app, minimum_size=COMPRESS_MIN_SIZE, compresslevel=GZIP_LEVEL, brotli_quality=BROTLI_QUALITY):
+        super().__init__(app, minimum_size, compresslevel)
+        self.brotli_quality = brotli_quality if brotli_available() else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(UNCOMPRESSED_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if "br" in accepted and self.brotli_quality is not None:
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+        elif "gzip" in accepted:
+            responder = GzipResponder(self.app, self.minimum_size, self.compresslevel)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
+
+
+_release = None
+
+
+def release():
+    """Hash of the deployed code and templates, so a deploy changes every ETag"""
+    global _release
+    if _release is None:
+        digest = hashlib.sha1(os.getenv("ETAG_SALT", "").encode())
+        for root, dirs, files in os.walk(APP_DIR):
+            dirs[:] = sorted(d for d in dirs if d not in ("static", "__pycache__"))
+            for name in sorted(files):
+                if name.endswith((".py", ".html")):
+                    with open(os.path.join(root, name), "rb") as f:
+                        digest.update(name.encode() + f.read())
+        _release = digest.hexdigest()
+    return _release
+
+
+def etag_for(user_id, name, version, path, query):
+    key = f"{release()}:{user_id}:{name}:{version}:{date.today()}:{path}?{query}"
+    return f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+
+def etag_matches(header, etag):
+    """Weak comparison against an If-None-Match list"""
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+class ConditionalGetMiddleware:
+    """Plain ASGI middleware; must run inside SessionMiddleware"""
+
+    def __init__(self, app, paths=CONDITIONAL_PATHS):
+        self.app = app
+        self.paths = paths
+
+    def _applies(self, scope):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return False
+        path = scope["path"]
+        return any(path == prefix or path.startswith(prefix.rstrip("/") + "/") for prefix in self.paths)
+
+    async def __call__(self, scope, receive, send):
+        session = scope.get("session") if self._applies(scope) else None
+        user_id = session.get("user_id") if session else None
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        async with database.async_read_session(request) as db:
+            version = await async_crud.data_version(user_id=user_id, db=db)
+        etag = etag_for(user_id, session.get("name"), version, scope["path"], scope["query_string"].decode("latin-1"))
+
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            await send({"type": "http.response.start", "status": 304, "headers": [
+                (b"etag", etag.encode()), (b"cache-control", CACHE_CONTROL.encode()), (b"vary", b"Cookie"),
+            ]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                # Replaces a handler's own content ETag (api.py), which is
+                # only known after the queries ran
+                headers = MutableHeaders(scope=message)
+                headers["ETag"] = etag
+                headers["Cache-Control"] = CACHE_CONTROL
+                headers.add_vary_header("Cookie")
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
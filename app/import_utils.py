@@ -0,0 +1,127 @@
+import argparse
+import csv
+import math
+from datetime import date
+from sqlalchemy import insert
+from app.models import Category, Expense
+from app.export_utils import EXPORT_COLUMNS
+from app.rollup_utils import apply_deltas, transaction_delta
+from app.cache import bump_data_version
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+def _category_lookup(db, user_id):
+    """(name, type) -> Category.id for the user's and default categories; user-owned wins"""
+    categories = db.query(Category.id, Category.name, Category.type, Category.user_id).filter(
+        (Category.user_id == user_id) | (Category.user_id == None)
+    ).all()
+    lookup = {}
+    for cat in sorted(categories, key=lambda c: c.user_id is not None):
+        lookup[(cat.name.strip().lower(), cat.type)] = cat.id
+    return lookup
+
+
+def _parse_row(row, user_id, categories):
+    try:
+        txn_date = date.fromisoformat((row.get("Date") or "").strip())
+    except ValueError:
+        raise ValueError(f"invalid date {row.get('Date')!r}")
+
+    type = (row.get("Type") or "").strip().lower()
+    if type not in ["income", "expense"]:
+        raise ValueError(f"invalid type {row.get('Type')!r}")
+
+    try:
+        amount = float((row.get("Amount") or "").strip())
+    except ValueError:
+        raise ValueError(f"invalid amount {row.get('Amount')!r}")
+    # float() accepts "nan" / "inf", which the amount column cannot hold
+    if not math.isfinite(amount):
+        raise ValueError(f"invalid amount {row.get('Amount')!r}")
+
+    name = (row.get("Category") or "").strip()
+    category_id = categories.get((name.lower(), type))
+    if category_id is None:
+        raise ValueError(f"unknown {type} category {name!r}")
+
+    return {
+        "user_id": user_id,
+        "category_id": category_id,
+        "date": txn_date,
+        "type": type,
+        "amount": amount,
+        "description": (row.get("Description") or "").strip() or None,
+    }
+
+
+def _insert_batch(db, batch):
+    # executemany over a Core insert: SQLAlchemy renders cached multi-row
+    # INSERT ... VALUES statements (insertmanyvalues), no ORM unit of work
+    db.execute(insert(Expense), batch)
+    apply_deltas(db, [
+        transaction_delta(row["user_id"], row["category_id"], row["date"], row["type"], row["amount"])
+        for row in batch
+    ])
+
+
+def import_transactions(db, user_id, lines, batch_size=IMPORT_BATCH_SIZE):
+    """Import CSV rows (same columns as the CSV export) in one transaction.
+
+    `lines` is any iterable of text lines, e.g. an open file. Invalid rows are
+    reported and skipped; valid rows are inserted in multi-row batches.
+    """
+    reader = csv.DictReader(lines)
+    missing = [col for col in EXPORT_COLUMNS if col not in (reader.fieldnames or [])]
+    if missing:
+        return {"imported": 0, "error_count": 1,
+                "errors": [{"line": 1, "error": f"missing columns: {', '.join(missing)}"}]}
+
+    categories = _category_lookup(db, user_id)
+    imported = 0
+    error_count = 0
+    errors = []
+    batch = []
+
+    try:
+        for row in reader:
+            try:
+                batch.append(_parse_row(row, user_id, categories))
+            except ValueError as e:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": reader.line_num, "error": str(e)})
+                continue
+
+            if len(batch) == batch_size:
+                _insert_batch(db, batch)
+                imported += len(batch)
+                batch = []
+
+        if batch:
+            _insert_batch(db, batch)
+            imported += len(batch)
+        bump_data_version(db, user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return {"imported": imported, "error_count": error_count, "errors": errors}
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Bulk import transactions from a CSV file")
+    parser.add_argument("path")
+    parser.add_argument("--user-id", type=int, required=True)
+    args = parser.parse_args()
+
+    with open(args.path, newline="", encoding="utf-8-sig") as f, SessionLocal() as db:
+        result = import_transactions(db, args.user_id, f)
+
+    print(f"imported {result['imported']} rows, {result['error_count']} errors")
+    for error in result["errors"]:
+        print(f"  line {error['line']}: {error['error']}")
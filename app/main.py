@@ -1,56 +1,104 @@
 # app/main.py
+#
+# Importing this module only declares the app: no DB connection, no DDL.
+# The lifespan does the startup work, in order:
+#   1. apply pending migrations only when MIGRATE_ON_STARTUP=1 (development,
+#      single worker); deploys run `python -m app.migrations` as a separate
+#      step before starting the workers
+#   2. create the engines and attach the SQL profiler / metrics listeners
+#   3. compile every template (and hash code + templates for the ETags)
+# and on shutdown stops the password hashing workers and closes the pools.
 
-from fastapi import FastAPI, Request, Depends
-from fastapi.encoders import jsonable_encoder
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import extract, func
-from starlette.middleware.sessions import SessionMiddleware
-from starlette.responses import RedirectResponse
-from . import auth, crud
-from .database import engine, get_db
-from sqlalchemy.orm import Session
-from .models import Base, Category
-import os
-from datetime import date, datetime, timedelta
 import calendar
-from dotenv import load_dotenv
 import os
-from fastapi.responses import HTMLResponse
-from fastapi import Form
-from .budget_utils import get_budget_progress
-from .budget_overview_util import get_budget_overview,get_budget_overview_comparison,get_category_monthly_spending_comparison,get_line_chart_data_for_category
-from .category_utils import get_all_categories_with_budget, upsert_category_budget
-from fastapi import Query
-
-
-from app import models
-
-
-app = FastAPI()
-
-load_dotenv()
-
-# Create tables if not already created
-Base.metadata.create_all(bind=engine)
-
-app.mount("/static", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "static")), name="static")
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from io import TextIOWrapper
 
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.responses import HTMLResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.responses import RedirectResponse, Response
+
+from . import api, assets, async_crud, auth, crud, database, http_cache, metrics, passwords, profiler, templating
+from .database import (
+    get_async_db, get_async_read_db, get_async_write_db, get_write_db, read_session_factory,
+)
+from .export_utils import EXPORT_FORMATS, encode_export, iter_transaction_rows, parquet_available
+from .import_utils import import_transactions
+from .migrations import migrate
+from .templating import templates
+
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "0").lower() in ("1", "true", "yes")
+
+
+def instrument_engines():
+    """SQL profiler (Server-Timing, slow-query / N+1 log) and metrics listeners"""
+    database.init_engines()
+    engines = {
+        "sync": database.engine,
+        "async": database.async_engine.sync_engine,
+        "replica": database.replica_engine,
+        "async_replica": database.async_replica_engine.sync_engine,
+    }
+    if profiler.QUERY_PROFILER:
+        profiler.instrument(*engines.values())
+    if metrics.METRICS:
+        for name, engine in engines.items():
+            # Without a replica the replica names alias the primary engines
+            if name in ("sync", "async") or database.REPLICA_DATABASE_URL:
+                metrics.instrument_engine(engine, name)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MIGRATE_ON_STARTUP:
+        migrate()
+    instrument_engines()
+    templating.precompile()
+    if http_cache.CONDITIONAL_GET:
+        http_cache.release()
+    yield
+    passwords.shutdown()
+    await database.dispose_engines()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Fingerprinted, pre-compressed assets; SERVE_STATIC=0 when a front proxy serves them
+if assets.SERVE_STATIC:
+    app.mount("/static", assets.AssetFiles(), name="static")
+
+# 304 for unchanged pages before any aggregate query (weak ETag from data_version)
+if http_cache.CONDITIONAL_GET:
+    app.add_middleware(http_cache.ConditionalGetMiddleware)
+
+# Per-request SQL profile: Server-Timing header, slow-query / N+1 log
+if profiler.QUERY_PROFILER:
+    app.add_middleware(profiler.QueryProfilerMiddleware)
+
+# Prometheus metrics on /metrics: route latency, in-flight, templates, SQL, pool, cache
+if metrics.METRICS:
+    metrics.instrument_templates(templates)
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# brotli / gzip above COMPRESS_MIN_SIZE
+if http_cache.COMPRESS_RESPONSES:
+    app.add_middleware(http_cache.CompressionMiddleware)
 
 # Session Middleware (use a secure secret key in production!)
 app.add_middleware(SessionMiddleware, secret_key=os.getenv("SECRET_KEY"))
 
 #app.add_middleware(SessionMiddleware, secret_key="your-secret-key")
 
-# Mount static files (CSS, JS)
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-
-# Jinja2 template directory
-templates = Jinja2Templates(directory="app/templates")
-
 # Include auth routes (login/register/logout)
 app.include_router(auth.router)
 
+# JSON API (/api/...)
+app.include_router(api.router)
+
 
 # Dependency to get logged-in user
 def get_current_user(request: Request):
@@ -59,15 +107,24 @@ def get_current_user(request: Request):
         return None
     return user_id
 
+if metrics.METRICS:
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/")
 def home():
     return RedirectResponse("/login")
 
+# Transactions rendered per dashboard page
+DASHBOARD_PAGE_SIZE = 50
+
 @app.get("/dashboard")
-def dashboard(
+async def dashboard(
     request: Request,
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     type: str = "expense",  # income / expense / all
     period: str = "month",  # day / week / month / year
     category: str = None,  # NEW: category filter
@@ -75,6 +132,7 @@ def dashboard(
     week: str = None,
     month: str = None,
     year: str = None,
+    cursor: str = None,  # keyset pagination: "<date>:<id>" of the last row shown
 ):
     if not user_id:
         return RedirectResponse("/login")
@@ -119,52 +177,54 @@ def dashboard(
         to_date = datetime.strptime(year, "%Y").replace(month=12, day=31).date()
         period_label = year
 
-    # Filter transactions with optional category
-    transactions = crud.get_filtered_transactions(user_id, type, from_date, to_date, db)
-    if category:
-        transactions = [txn for txn in transactions if txn.category.name == category]
-
-    income, expense, profit = crud.get_stats(user_id, db)
-    total_amount = income - expense
-
-    if type in ["income", "expense"]:
-        pie = crud.get_pie_chart_data_filtered(user_id, type, from_date, to_date, db)
-        labels = pie["labels"]
-        values = pie["data"]
-    else:
-        labels, values = [], []
-
-    progress_data = get_budget_progress(db, user_id)
-    all_categories = crud.get_all_categories(user_id, db)
+    # One page of transactions, category filter applied in SQL
+    transactions = await async_crud.get_filtered_transactions(
+        user_id, type, from_date, to_date, db=db,
+        category=category,
+        cursor=crud.decode_cursor(cursor) if cursor else None,
+        limit=DASHBOARD_PAGE_SIZE + 1,
+    )
+    next_cursor = None
+    if len(transactions) > DASHBOARD_PAGE_SIZE:
+        transactions = transactions[:DASHBOARD_PAGE_SIZE]
+        next_cursor = crud.encode_cursor(transactions[-1])
+
+    # Totals, pie, budget progress and category list in two queries
+    summary = await async_crud.get_dashboard_summary(
+        user_id=user_id, type=type, from_date=from_date, to_date=to_date, db=db
+    )
 
     return templates.TemplateResponse(
         "dashboard.html",
         {
             "request": request,
             "transactions": transactions,
-            "labels": labels,
-            "values": values,
+            "next_cursor": next_cursor,
+            "labels": summary["labels"],
+            "values": summary["values"],
             "type": type,
             "period": period,
             "period_label": period_label,
-            "total_amount": total_amount,
-            "progress_data": progress_data,
+            "total_amount": summary["income"] - summary["expense"],
+            "progress_data": summary["progress_data"],
             "selected_category": category,
-            "all_categories": all_categories,
+            "all_categories": summary["all_categories"],
+            "user_id": user_id,
+            "data_version": await async_crud.fragment_version(user_id=user_id, db=db),
         },
     )
 
 #to add transaction
 @app.get("/add")
-def add_expense_form(
+async def add_expense_form(
     request: Request,
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not user_id:
         return RedirectResponse("/login")
     
-    categories = db.query(Category).filter(Category.user_id == user_id).all()
+    categories = await async_crud.get_categories(user_id=user_id, db=db)
 
     return templates.TemplateResponse(
         "add.html",
@@ -176,16 +236,16 @@ def add_expense_form(
 async def add_expense(
     request: Request,
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_write_db),
 ):
 
     if not user_id:
         return RedirectResponse("/login")
 
     form = await request.form()
-    crud.add_expense(
+    await async_crud.add_expense(
         user_id=user_id,
-        date=form["date"],
+        date=datetime.strptime(form["date"], "%Y-%m-%d").date(),
         category_id=int(form["category"]),
         amount=float(form["amount"]),
         description=form["description"],
@@ -197,14 +257,14 @@ async def add_expense(
 
 
 @app.get("/edit/{txn_id}", response_class=HTMLResponse)
-def edit_transaction(
+async def edit_transaction(
     txn_id: int,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = Depends(get_current_user)
 ):
-    txn = crud.get_transaction_by_id(db, txn_id, user_id)  # Pass user_id here
-    categories = crud.get_categories(db, user_id)
+    txn = await async_crud.get_transaction_by_id(txn_id=txn_id, user_id=user_id, db=db)  # Pass user_id here
+    categories = await async_crud.get_categories(user_id=user_id, db=db)
     return templates.TemplateResponse("edit_transaction.html", {
         "request": request,
         "txn": txn,
@@ -214,7 +274,7 @@ def edit_transaction(
 
 
 @app.post("/edit/{txn_id}")
-def update_transaction(
+async def update_transaction(
     txn_id: int,
     request: Request,
     date: str = Form(...),
@@ -222,194 +282,171 @@ def update_transaction(
     category: int = Form(...),
     amount: float = Form(...),
     description: str = Form(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_write_db)
 ):
-    crud.update_transaction(db, txn_id, date, type, category, amount, description)
+    await async_crud.update_transaction(
+        txn_id=txn_id, date=datetime.strptime(date, "%Y-%m-%d").date(), type=type,
+        category_id=category, amount=amount, description=description, db=db
+    )
     return RedirectResponse("/dashboard", status_code=302)
 
 
 
 @app.post("/delete/{txn_id}")
-def delete_transaction(txn_id: int, db: Session = Depends(get_db)):
-    crud.delete_transaction(db, txn_id)
+async def delete_transaction(txn_id: int, db: AsyncSession = Depends(get_async_write_db)):
+    await async_crud.delete_transaction(txn_id=txn_id, db=db)
     return RedirectResponse("/dashboard", status_code=302)
 
 
 
 @app.get("/charts")
-def charts(
+async def charts(
     request: Request,
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    period: str = "month",
+    db: AsyncSession = Depends(get_async_read_db),
+    period: str = "month",  # day / week / month / quarter / year
     tab: str = "general",
     category: str = None,
+    periods: int = Query(5, ge=1, le=3660),
+    from_date: date = Query(None, alias="from"),
+    to_date: date = Query(None, alias="to"),
 ):
-    from_date, to_date = None, None
-    today = datetime.today().date()
-
-    # Prepare label ranges
-    def get_last_years(n=5):
-        return [str(today.year - i) for i in reversed(range(n))]
-
-    def get_last_months(n=5):
-        labels = []
-        for i in range(n-1, -1, -1):
-            month = (today.month - i - 1) % 12 + 1
-            year = today.year - ((today.month - i - 1) // 12 < 0)
-            labels.append(datetime(year, month, 1).strftime("%b"))
-        return labels
-    
-    def get_last_weeks(n=5):
-        return [(today - timedelta(days=today.weekday()) - timedelta(weeks=i)).strftime("%Y-%m-%d")
-                for i in reversed(range(n))]
-
-
-    def get_last_days(n=5):
-        days = []
-        for i in reversed(range(n)):
-            d = today - timedelta(days=i)
-            days.append(d.strftime("%Y-%m-%d"))  # full ISO format
-        return days, today.strftime("%B %Y")
-        
-
-    # Generate x-axis labels
-    if period == "year":
-        labels = get_last_years()
-    elif period == "month":
-        labels = get_last_months()
-    elif period == "week":
-        labels = get_last_weeks()
-    elif period == "day":
-        labels, month_label = get_last_days()
+    from .timeseries import GRANULARITIES, MAX_PERIODS, bucket_count, last_periods
+
+    if period not in GRANULARITIES:
+        period = "month"
+    if periods > MAX_PERIODS[period]:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PERIODS[period]} {period} periods")
+    if from_date is not None:
+        # A custom range gets the same bound as `periods`
+        end = to_date or date.today()
+        if from_date > end:
+            raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+        if bucket_count(period, from_date, end) > MAX_PERIODS[period]:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_PERIODS[period]} {period} periods")
     else:
-        labels = []
-        month_label = ""
-
-    # Get actual chart data from DB
-    summary = crud.get_summary_by_period(user_id, period, category, db)
-    label_map = {row[0]: (row[1], row[2]) for row in summary}
-
-    income_data, expense_data, profit_data, loss_data = [], [], [], []
-
-    for label in labels:
-        income = label_map.get(label, (0, 0))[0]
-        expense = label_map.get(label, (0, 0))[1]
-        profit = max(income - expense, 0)
-        loss = max(expense - income, 0)
-
-        income_data.append(income)
-        expense_data.append(expense)
-        profit_data.append(profit)
-        loss_data.append(loss)
+        try:
+            last_periods(period, periods, to_date)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+    # Zero-filled series for the last `periods` buckets, or the from/to range
+    series = await async_crud.get_summary_by_period(
+        user_id, period, category, db=db, periods=periods, from_date=from_date, to_date=to_date
+    )
+    labels = series["labels"]
+    month_label = datetime.today().strftime("%B %Y") if period == "day" else ""
 
     # Overall totals
-    income, expense, profit = crud.get_stats(user_id, db)
+    income, expense, profit = await async_crud.get_stats(user_id, db=db)
+    categories = await async_crud.get_all_categories(user_id, db=db)
 
     return templates.TemplateResponse("charts.html", {
         "request": request,
         "labels": labels,
-        "income_data": income_data,
-        "expense_data": expense_data,
-        "profit_data": profit_data,
-        "loss_data": loss_data,
+        "income_data": series["income"],
+        "expense_data": series["expense"],
+        "profit_data": series["profit"],
+        "loss_data": series["loss"],
         "income": income,
         "expense": expense,
         "profit": profit,
         "tab": tab,
         "period": period,
-        "month_label": month_label if period == "day" else "",
-        "categories": crud.get_all_categories(user_id, db),
+        "month_label": month_label,
+        "categories": categories,
         "selected_category": category  # pass selected
     })
 
 #for categories - categories.html
 
 @app.get("/categories", response_class=HTMLResponse)
-def view_categories(request: Request, user_id: int = Depends(get_current_user), db: Session = Depends(get_db)):
+async def view_categories(request: Request, user_id: int = Depends(get_current_user), db: AsyncSession = Depends(get_async_read_db)):
     if not user_id:
         return RedirectResponse("/login")
 
-    categories = get_all_categories_with_budget(db, user_id)
-    return templates.TemplateResponse("categories.html", {"request": request, "categories": categories})
+    categories = await async_crud.get_all_categories_with_budget(user_id=user_id, db=db)
+    return templates.TemplateResponse("categories.html", {
+        "request": request,
+        "categories": categories,
+        "user_id": user_id,
+        "data_version": await async_crud.fragment_version(user_id=user_id, db=db),
+    })
 
 
 @app.post("/categories/add")
-def add_category(
+async def add_category(
     request: Request,
     name: str = Form(...),
     type: str = Form(...),
     budget: float = Form(None),
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_write_db)
 ):
     if not user_id:
         return RedirectResponse("/login")
 
     # Add new category (user-owned)
-    new_category = crud.add_category(db=db, user_id=user_id, name=name, type=type)
+    new_category = await async_crud.add_category(db=db, user_id=user_id, name=name, type=type)
 
     # Save budget for current month
     if budget:
-        upsert_category_budget(db, new_category.id, user_id, budget)
+        await async_crud.upsert_category_budget(
+            category_id=new_category.id, user_id=user_id, budget=budget, db=db
+        )
 
     return RedirectResponse("/categories", status_code=302)
 
 
 @app.post("/categories/update/{category_id}")
-def update_category(
+async def update_category(
     request: Request,
     category_id: int,
     name: str = Form(...),
     budget: float = Form(None),
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_write_db)
 ):
     if not user_id:
         return RedirectResponse("/login")
 
-    crud.update_category(category_id=category_id, name=name, user_id=user_id, db=db)
-    upsert_category_budget(db, category_id, user_id, budget)
+    await async_crud.update_category(category_id=category_id, name=name, user_id=user_id, db=db)
+    if budget is not None:
+        await async_crud.upsert_category_budget(category_id=category_id, user_id=user_id, budget=budget, db=db)
 
     referer = request.headers.get("referer", "/categories")
     return RedirectResponse(referer, status_code=302)
 
 
 @app.post("/categories/delete/{category_id}")
-def delete_category(
+async def delete_category(
     request: Request,
     category_id: int,
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_write_db)
 ):
     if not user_id:
         return RedirectResponse("/login")
 
-    crud.delete_category(category_id=category_id, user_id=user_id, db=db)
+    await async_crud.delete_category(category_id=category_id, user_id=user_id, db=db)
     return RedirectResponse("/categories", status_code=302)
 
 
 #for budget overview - budget_overview.html
-from fastapi import Query
 
 @app.get("/budget_overview", response_class=HTMLResponse)
-def budget_overview(
+async def budget_overview(
     request: Request,
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     selected_category: str = Query(None, alias="category")
 ):
     if not user_id:
         return RedirectResponse("/login")
 
-    all_categories = db.query(models.Category).filter(
-        ((models.Category.user_id == user_id) | (models.Category.user_id == None)) &
-        (models.Category.type == "expense")
-    ).all()
-
-    overview_data = get_budget_overview(db, user_id)
-    comparison_data = get_budget_overview_comparison(db, user_id)
-    chart_data = get_line_chart_data_for_category(db, user_id, selected_category)
+    # Categories + budgets + monthly spending, and the selected category's daily spending
+    data = await async_crud.load_budget_overview(user_id, selected_category, db=db)
+    chart_data = data["chart_data"]
 
     labels = chart_data.get("labels", [])
     this_month_data = chart_data.get("this_month", [])
@@ -417,31 +454,57 @@ def budget_overview(
 
     return templates.TemplateResponse("budget_overview.html", {
         "request": request,
-        "overview_data": overview_data,
-        "comparison_data": comparison_data,
-        "all_expense_categories": all_categories,
+        "overview_data": data["overview_data"],
+        "comparison_data": data["comparison_data"],
+        "all_expense_categories": data["categories"],
         "selected_category": selected_category,
         "line_labels": labels,
         "this_month_data": this_month_data,
-        "last_month_data": last_month_data
+        "last_month_data": last_month_data,
+        "user_id": user_id,
+        "data_version": await async_crud.fragment_version(user_id=user_id, db=db),
     })
-import csv
-from fastapi.responses import StreamingResponse
-from io import StringIO
-
-@app.get("/export/csv")
-def export_csv(user_id: int = Depends(get_current_user), db: Session = Depends(get_db)):
-    transactions = crud.get_all_transactions(user_id=user_id, db=db)
-
-    def generate():
-        data = StringIO()
-        writer = csv.writer(data)
-        writer.writerow(["Date", "Type", "Category", "Amount", "Description"])
-        for txn in transactions:
-            writer.writerow([txn.date, txn.type, txn.category.name, txn.amount, txn.description])
-        data.seek(0)
-        return data
-
-    return StreamingResponse(generate(), media_type="text/csv", headers={
-        "Content-Disposition": "attachment; filename=transactions.csv"
+
+@app.get("/export/{fmt}")
+def export_transactions(
+    fmt: str,
+    request: Request,
+    user_id: int = Depends(get_current_user),
+    type: str = None,
+    category: str = None,
+    from_date: date = Query(None, alias="from"),
+    to_date: date = Query(None, alias="to"),
+):
+    """Export as csv, csv.gz, ndjson or parquet"""
+    if not user_id:
+        return RedirectResponse("/login")
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=404, detail=f"Unknown export format: {fmt}")
+    if fmt == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    # Rows are streamed from a server-side cursor and encoded in chunks
+    media_type, filename = EXPORT_FORMATS[fmt]
+    rows = iter_transaction_rows(
+        user_id, type, from_date, to_date, category, session_factory=read_session_factory(request)
+    )
+    return StreamingResponse(encode_export(fmt, rows), media_type=media_type, headers={
+        "Content-Disposition": f"attachment; filename={filename}"
     })
+
+
+#for bulk import - upload a CSV in the export format
+
+@app.post("/import/csv")
+def import_csv(
+    file: UploadFile = File(...),
+    user_id: int = Depends(get_current_user),
+    db: Session = Depends(get_write_db)
+):
+    if not user_id:
+        return RedirectResponse("/login", status_code=302)
+
+    try:
+        return import_transactions(db, user_id, TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be a UTF-8 encoded CSV")
@@ -0,0 +1,317 @@
+# app/metrics.py
+#
+# Prometheus metrics served on /metrics (text exposition format 0.0.4):
+# per-route request counts and latency histograms, in-flight requests,
+# unhandled exceptions, template render time, SQL statement time per engine,
+# plus the connection pool and aggregate cache counters at scrape time.
+#
+#   METRICS (1)    install the middleware, listeners and the /metrics route
+#
+# Hot-path updates take no lock: every thread writes only to its own shard
+# (a plain dict) and a scrape sums the shards. The event loop thread owns one
+# shard, so async routes never contend with threadpool handlers.
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event
+
+from . import cache, database
+
+METRICS = os.getenv("METRICS", "1").lower() in ("1", "true", "yes")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+
+_registry = []
+_collectors = []
+_engine_names = {}  # engine -> label of its statements
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _shard(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append(values)
+            return values
+
+    def _items(self):
+        # list() of a dict view is a single C call under the GIL, so a shard
+        # growing in another thread cannot break the iteration
+        with self._lock:
+            shards = list(self._shards)
+        return [item for shard in shards for item in list(shard.items())]
+
+    def _label_text(self, values, extra=""):
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        return lines + self._samples()
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount=1):
+        values = self._shard()
+        values[labels] = values.get(labels, 0) + amount
+
+    def _totals(self):
+        totals = {}
+        for labels, value in self._items():
+            totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def _samples(self):
+        return [f"{self.name}{self._label_text(labels)} {_number(value)}"
+                for labels, value in sorted(self._totals().items())]
+
+
+class Gauge(Counter):
+    """Up / down counter; each shard holds its thread's net change"""
+    type = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        values = self._shard()
+        entry = values.get(labels)
+        if entry is None:
+            # One count per bucket plus +Inf, then the sum
+            entry = values[labels] = [0] * (len(self.buckets) + 2)
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def _samples(self):
+        totals = {}
+        for labels, entry in self._items():
+            total = totals.setdefault(labels, [0] * len(entry))
+            for i, value in enumerate(entry):
+                total[i] += value
+
+        lines = []
+        for labels, entry in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), entry):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{self._label_text(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(labels)} {_number(entry[-1])}")
+            lines.append(f"{self.name}_count{self._label_text(labels)} {cumulative}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def collector(func):
+    """Register `func() -> [lines]`, called on every scrape (pool / cache state)"""
+    _collectors.append(func)
+    return func
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines += metric.expose()
+    for func in _collectors:
+        lines += func()
+    return "\n".join(lines) + "\n"
+
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status",
+                        ("method", "route", "status"))
+http_duration = Histogram("http_request_duration_seconds", "HTTP request latency by route",
+                          ("method", "route"))
+http_in_progress = Gauge("http_requests_in_progress", "HTTP requests being served", ("method",))
+http_exceptions = Counter("http_request_exceptions_total", "Unhandled exceptions by route",
+                          ("method", "route", "exception"))
+template_duration = Histogram("template_render_seconds", "Jinja template render time",
+                              ("template",))
+db_duration = Histogram("db_query_duration_seconds", "SQL statement execution time",
+                        ("engine", "operation"), buckets=QUERY_BUCKETS)
+db_errors = Counter("db_query_errors_total", "SQL statements that raised", ("engine",))
+
+
+def route_of(scope):
+    """Route template ('/edit/{txn_id}'), never the raw path, to bound label cardinality"""
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware: no per-request Request object or task"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_progress.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as error:
+            http_exceptions.inc(method, route_of(scope), type(error).__name__)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_progress.dec(method)
+            route = route_of(scope)
+            http_requests.inc(method, route, str(status))
+            http_duration.observe(elapsed, method, route)
+
+
+def instrument_templates(templates):
+    """Time TemplateResponse (Starlette renders the template in the constructor)"""
+    render_response = templates.TemplateResponse
+
+    def TemplateResponse(*args, **kwargs):
+        name = args[0] if args and isinstance(args[0], str) else kwargs.get("name", args[1] if len(args) > 1 else "")
+        start = time.perf_counter()
+        try:
+            return render_response(*args, **kwargs)
+        finally:
+            template_duration.observe(time.perf_counter() - start, name)
+
+    templates.TemplateResponse = TemplateResponse
+    return templates
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_start")
+    if starts:
+        operation = statement.split(None, 1)[0].upper()
+        db_duration.observe(time.perf_counter() - starts.pop(), _engine_names.get(conn.engine, ""), operation)
+
+
+def _handle_error(context):
+    starts = context.connection.info.get("metrics_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+    db_errors.inc(_engine_names.get(context.engine, ""))
+
+
+ENGINE_EVENTS = (
+    ("before_cursor_execute", _before_cursor_execute),
+    ("after_cursor_execute", _after_cursor_execute),
+    ("handle_error", _handle_error),
+)
+
+
+def instrument_engine(engine, name):
+    """Time statements on a (sync) engine; use `.sync_engine` for async ones"""
+    _engine_names[engine] = name
+    for identifier, listener in ENGINE_EVENTS:
+        if not event.contains(engine, identifier, listener):
+            event.listen(engine, identifier, listener)
+
+
+def uninstrument_engine(engine):
+    for identifier, listener in ENGINE_EVENTS:
+        if event.contains(engine, identifier, listener):
+            event.remove(engine, identifier, listener)
+    _engine_names.pop(engine, None)
+
+
+def _family(name, type, help, samples):
+    """Exposition lines for one metric family from (label text, value) pairs"""
+    return [f"# HELP {name} {help}", f"# TYPE {name} {type}"] + [
+        f"{name}{labels} {_number(value)}" for labels, value in samples if value is not None
+    ]
+
+
+@collector
+def _pool_lines():
+    pools = [(f'{{pool="{name}"}}', pm.snapshot()) for name, pm in database.pool_metrics.items()]
+    lines = []
+    for key, type, help in (
+        ("size", "gauge", "Configured pool size"),
+        ("checked_out", "gauge", "Connections checked out"),
+        ("overflow", "gauge", "Overflow connections open"),
+        ("checkouts", "counter", "Connection checkouts"),
+        ("timeouts", "counter", "Checkouts that timed out waiting for a connection"),
+    ):
+        name = f"db_pool_{key}_total" if type == "counter" else f"db_pool_{key}"
+        lines += _family(name, type, help, [(labels, snap[key]) for labels, snap in pools])
+
+    name = "db_pool_checkout_wait_seconds"
+    lines += [f"# HELP {name} Time waiting for a pool connection", f"# TYPE {name} histogram"]
+    for labels, snap in pools:
+        pool = labels[1:-1]
+        cumulative = 0
+        for bound, count in snap["wait_ms_buckets"].items():
+            cumulative += count
+            le = "+Inf" if bound == "+Inf" else _number(float(bound) / 1000)
+            lines.append(f'{name}_bucket{{{pool},le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum{labels} {_number(snap['wait_ms_sum'] / 1000)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+    return lines
+
+
+@collector
+def _cache_lines():
+    aggregate = cache.cache
+    if aggregate is None:
+        return []
+    labels = f'{{backend="{type(aggregate.backend).__name__}"}}'
+    # Counters only: the entry count would need a key scan on Redis
+    return (
+        _family("cache_hits_total", "counter", "Aggregate cache hits", [(labels, aggregate.hits)])
+        + _family("cache_misses_total", "counter", "Aggregate cache misses", [(labels, aggregate.misses)])
+        + _family("cache_evictions_total", "counter", "Aggregate cache evictions",
+                  [(labels, aggregate.backend.evictions)])
+    )
@@ -0,0 +1,148 @@
+# app/migrations.py
+#
+# Versioned schema migrations. Run with `python -m app.migrations`.
+# Every step is idempotent (checkfirst), so it is safe to run against
+# databases that were created by the old `Base.metadata.create_all` call.
+# Concurrent runs (e.g. several workers booting with MIGRATE_ON_STARTUP=1)
+# are serialized: a Postgres advisory lock, or BEGIN EXCLUSIVE on SQLite.
+
+import sys
+from contextlib import contextmanager, nullcontext
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, delete, func, inspect, select, text
+
+from . import database, models, rollup_utils
+from .database import Base
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+)
+
+
+def _create_tables(conn):
+    Base.metadata.create_all(bind=conn)
+
+
+def _dedupe_category_budgets(conn):
+    """Keep only the newest budget row per (user, category, year, month)"""
+    cb = models.CategoryBudget.__table__
+    newest = select(func.max(cb.c.id)).group_by(
+        cb.c.user_id, cb.c.category_id, cb.c.year, cb.c.month
+    )
+    conn.execute(delete(cb).where(cb.c.id.not_in(newest)))
+
+
+def _create_query_indexes(conn):
+    _dedupe_category_budgets(conn)
+    for table in (models.Expense.__table__, models.CategoryBudget.__table__):
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+def _create_monthly_rollup(conn):
+    models.MonthlyCategoryTotal.__table__.create(bind=conn, checkfirst=True)
+    rollup_utils.rebuild(conn, bump_versions=False)
+
+
+def _add_user_data_version(conn):
+    columns = {col["name"] for col in inspect(conn).get_columns("users")}
+    if "data_version" not in columns:
+        conn.exec_driver_sql("ALTER TABLE users ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0")
+
+
+def _create_series_index(conn):
+    for index in models.Expense.__table__.indexes:
+        if index.name == "ix_expenses_user_date_type_amount":
+            index.create(bind=conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, "create tables", _create_tables),
+    (2, "composite expense indexes, unique category budget period", _create_query_indexes),
+    (3, "monthly_category_totals rollup, backfilled from expenses", _create_monthly_rollup),
+    (4, "users.data_version for aggregate cache invalidation", _add_user_data_version),
+    (5, "covering expense index for daily / weekly series", _create_series_index),
+]
+
+
+MIGRATION_LOCK_ID = 0x65787065  # any constant shared by every migrate() run
+LOCK_TIMEOUT_MS = 600_000
+
+
+def applied_versions(bind=None):
+    bind = bind or database.engine
+    with bind.begin() as conn:
+        schema_migrations.create(bind=conn, checkfirst=True)
+        return {row.version for row in conn.execute(select(schema_migrations.c.version))}
+
+
+def _pending(conn):
+    schema_migrations.create(bind=conn, checkfirst=True)
+    done = {row.version for row in conn.execute(select(schema_migrations.c.version))}
+    return [(version, name, step) for version, name, step in MIGRATIONS if version not in done]
+
+
+def _apply(conn, version, name, step):
+    step(conn)
+    conn.execute(schema_migrations.insert().values(version=version, name=name))
+
+
+@contextmanager
+def _advisory_lock(bind):
+    """Session-level Postgres advisory lock held while the block runs"""
+    with bind.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+
+def _migrate_sqlite(bind):
+    """All pending steps in one BEGIN EXCLUSIVE transaction; other runs wait for it"""
+    applied = []
+    with bind.connect() as conn:
+        # The driver must not open its own transaction around ours
+        conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.exec_driver_sql(f"PRAGMA busy_timeout = {LOCK_TIMEOUT_MS}")
+        conn.exec_driver_sql("BEGIN EXCLUSIVE")
+        try:
+            for version, name, step in _pending(conn):
+                _apply(conn, version, name, step)
+                applied.append((version, name))
+        except BaseException:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        conn.exec_driver_sql("COMMIT")
+    return applied
+
+
+def migrate(bind=None):
+    """Apply every pending migration, each in its own transaction (SQLite: one)"""
+    bind = bind or database.engine
+    if bind.dialect.name == "sqlite":
+        return _migrate_sqlite(bind)
+
+    applied = []
+    with _advisory_lock(bind) if bind.dialect.name == "postgresql" else nullcontext():
+        with bind.begin() as conn:
+            pending = _pending(conn)
+        for version, name, step in pending:
+            with bind.begin() as conn:
+                _apply(conn, version, name, step)
+            applied.append((version, name))
+    return applied
+
+
+if __name__ == "__main__":
+    if "--status" in sys.argv:
+        done = applied_versions()
+        for version, name, _ in MIGRATIONS:
+            print(f"{'x' if version in done else ' '} {version:>3}  {name}")
+    else:
+        for version, name in migrate():
+            print(f"applied {version}: {name}")
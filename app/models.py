@@ -1,6 +1,6 @@
 # app/models.py
 
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -13,6 +13,8 @@ class User(Base):
     name = Column(String, nullable=False)
     email = Column(String, unique=True, nullable=False)
     password = Column(String, nullable=False)
+    # Bumped on every write to the user's data; part of every aggregate cache key
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     expenses = relationship("Expense", back_populates="owner")
 
@@ -41,6 +43,15 @@ class Expense(Base):
     owner = relationship("User", back_populates="expenses")
     category = relationship("Category", back_populates="expenses")  # ← this must match
 
+    # Composite indexes for the dashboard / chart / budget query shapes
+    __table_args__ = (
+        Index("ix_expenses_user_date", "user_id", "date"),
+        Index("ix_expenses_user_type_date", "user_id", "type", "date"),
+        Index("ix_expenses_user_category_date", "user_id", "category_id", "date"),
+        # Covering index for the per-day / per-week series (app/timeseries.py)
+        Index("ix_expenses_user_date_type_amount", "user_id", "date", "type", "amount"),
+    )
+
 
 class CategoryBudget(Base):
     __tablename__ = "category_budgets"
@@ -50,4 +61,25 @@ class CategoryBudget(Base):
     category_id = Column(Integer, ForeignKey("categories.id"))
     month = Column(Integer, nullable=False)  # 1 to 12
     year = Column(Integer, nullable=False)
-    budget = Column(Float, nullable=False)
\ No newline at end of file
+    budget = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ux_category_budgets_user_category_period",
+            "user_id", "category_id", "year", "month",
+            unique=True,
+        ),
+    )
+
+
+class MonthlyCategoryTotal(Base):
+    """Per-month rollup of expenses, kept in sync by crud / import_utils (see rollup_utils)"""
+    __tablename__ = "monthly_category_totals"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)  # 1 to 12
+    type = Column(String, primary_key=True)  # 'income' or 'expense'
+    total = Column(Float, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,101 @@
+# app/passwords.py
+#
+# Password hashing service. bcrypt runs on a bounded process pool so a login
+# storm cannot starve the event loop or the threads serving other requests.
+#
+#   BCRYPT_ROUNDS (12)          cost factor for new hashes; older hashes are
+#                               upgraded on the next successful login
+#   PASSWORD_HASH_WORKERS (2)   pool processes, 0 = run in the threadpool
+#   PASSWORD_HASH_PER_IP (4)    concurrent hashes per client IP
+#   PASSWORD_HASH_PER_EMAIL (1) concurrent hashes per account email
+
+import asyncio
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+from passlib.hash import bcrypt
+from starlette.concurrency import run_in_threadpool
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_PER_IP = int(os.getenv("PASSWORD_HASH_PER_IP", "4"))
+PASSWORD_HASH_PER_EMAIL = int(os.getenv("PASSWORD_HASH_PER_EMAIL", "1"))
+
+hasher = bcrypt.using(rounds=BCRYPT_ROUNDS)
+
+_executor = None
+_pending = None
+_in_flight = Counter()
+
+
+class TooManyAttempts(Exception):
+    """A client or account already has its share of hashes in flight"""
+
+
+def _hash(password, rounds):
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def _verify(password, hashed):
+    return bcrypt.verify(password, hashed)
+
+
+def _get_executor():
+    global _executor, _pending
+    if _executor is None:
+        # spawn, not fork: forked workers would inherit the server's listening
+        # socket and outlive it. Scripts importing the app need a __main__ guard.
+        _executor = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+        # Bound the queue in front of the pool as well as the pool itself
+        _pending = asyncio.Semaphore(PASSWORD_HASH_WORKERS * 4)
+    return _executor
+
+
+async def _run(fn, *args):
+    if PASSWORD_HASH_WORKERS <= 0:
+        return await run_in_threadpool(fn, *args)
+    executor = _get_executor()
+    async with _pending:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+@asynccontextmanager
+async def hashing_slot(ip, email):
+    """Admit one hashing request for (ip, email) or raise TooManyAttempts"""
+    keys = [("ip", ip), ("email", email.lower())]
+    limits = [PASSWORD_HASH_PER_IP, PASSWORD_HASH_PER_EMAIL]
+    if any(_in_flight[key] >= limit for key, limit in zip(keys, limits)):
+        raise TooManyAttempts()
+    _in_flight.update(keys)
+    try:
+        yield
+    finally:
+        _in_flight.subtract(keys)
+        for key in keys:
+            if _in_flight[key] <= 0:
+                del _in_flight[key]
+
+
+async def hash_password(password):
+    return await _run(_hash, password, BCRYPT_ROUNDS)
+
+
+async def verify_password(password, hashed):
+    """(matches, replacement hash or None when the stored hash is current)"""
+    if not await _run(_verify, password, hashed):
+        return False, None
+    if hasher.needs_update(hashed):
+        return True, await hash_password(password)
+    return True, None
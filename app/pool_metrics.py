@@ -0,0 +1,69 @@
+# app/pool_metrics.py
+#
+# Connection pool instrumentation: checkouts, checkout wait time histogram,
+# timeouts, plus the pool's live checked-out / overflow counts.
+
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event, exc
+
+# Upper bounds (ms) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+
+class PoolMetrics:
+    def __init__(self, name, engine):
+        self.name = name
+        self.pool = engine.pool
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_counts = [0] * len(WAIT_BUCKETS_MS)
+        self.wait_sum_ms = 0.0
+        self._lock = threading.Lock()
+        event.listen(engine, "checkout", self._on_checkout)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def observe_wait(self, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            self.wait_sum_ms += ms
+            for i, bound in enumerate(WAIT_BUCKETS_MS):
+                if ms <= bound:
+                    self.wait_counts[i] += 1
+                    break
+
+    def observe_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    @contextmanager
+    def timed_checkout(self):
+        """Time the block (a connection checkout) and count pool timeouts"""
+        start = time.perf_counter()
+        try:
+            yield
+        except exc.TimeoutError:
+            self.observe_timeout()
+            raise
+        self.observe_wait(time.perf_counter() - start)
+
+    def snapshot(self):
+        pool = self.pool
+        return {
+            "pool": type(pool).__name__,
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms_sum": round(self.wait_sum_ms, 3),
+            "wait_ms_buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(WAIT_BUCKETS_MS, self.wait_counts)
+            },
+        }
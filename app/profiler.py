@@ -0,0 +1,166 @@
+# app/profiler.py
+#
+# Request-scoped SQL profiler. Engine listeners time every statement and
+# attribute it to the current request (a contextvar set by the middleware):
+# query count, total DB time, the slowest statements with the app call site
+# that issued them, and N+1 suspects (one statement shape repeated many times).
+#
+#   QUERY_PROFILER (1)          install the middleware
+#   SLOW_QUERY_MS (200)         log statements slower than this to "app.sql"
+#   N_PLUS_ONE_THRESHOLD (5)    repeats of one statement shape to flag
+#
+# Each response gets a Server-Timing header (db;dur=..;desc="N queries");
+# per-route totals are served by /api/debug/queries when DEBUG_ENDPOINTS=1.
+# Statements run while a streaming body is sent (exports) are not counted.
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.middleware.base import BaseHTTPMiddleware
+
+QUERY_PROFILER = os.getenv("QUERY_PROFILER", "1").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+SLOWEST_KEPT = 5
+
+logger = logging.getLogger("app.sql")
+
+_current = ContextVar("query_profile", default=None)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def call_site():
+    """file:line (function) of the innermost app frame outside this module"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and filename != __file__:
+            return f"{os.path.relpath(filename, os.path.dirname(APP_DIR))}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return None
+
+
+class QueryProfile:
+    """Statements issued while serving one request"""
+
+    def __init__(self, route):
+        self.route = route
+        self.count = 0
+        self.db_ms = 0.0
+        self.shapes = {}
+        self.slowest = []  # (ms, statement, call site), slowest first
+
+    def record(self, statement, ms, site):
+        self.count += 1
+        self.db_ms += ms
+        self.shapes[statement] = self.shapes.get(statement, 0) + 1
+        if len(self.slowest) < SLOWEST_KEPT or ms > self.slowest[-1][0]:
+            self.slowest = sorted(self.slowest + [(ms, statement, site)], reverse=True)[:SLOWEST_KEPT]
+
+    def repeated(self):
+        """Statement shapes issued at least N_PLUS_ONE_THRESHOLD times"""
+        return {shape: n for shape, n in self.shapes.items() if n >= N_PLUS_ONE_THRESHOLD}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    if profile is None or not conn.info.get("query_start"):
+        return
+    ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+    slow = ms >= SLOW_QUERY_MS
+    site = call_site() if slow or len(profile.slowest) < SLOWEST_KEPT or ms > profile.slowest[-1][0] else None
+    profile.record(statement, ms, site)
+    if slow:
+        logger.warning(json.dumps({
+            "event": "slow_query", "route": profile.route, "ms": round(ms, 1),
+            "call_site": site, "statement": " ".join(statement.split()),
+        }))
+
+
+def instrument(*engines):
+    """Time statements on these (sync) engines; use `.sync_engine` for async ones"""
+    for engine in engines:
+        if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class RouteStats:
+    """Per-route DB totals across requests, for /api/debug/queries"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}
+
+    def add(self, profile):
+        with self._lock:
+            stats = self.routes.setdefault(profile.route, {
+                "requests": 0, "queries": 0, "db_ms": 0.0, "max_db_ms": 0.0, "n_plus_one": 0,
+                "slowest": None,
+            })
+            stats["requests"] += 1
+            stats["queries"] += profile.count
+            stats["db_ms"] += profile.db_ms
+            stats["max_db_ms"] = max(stats["max_db_ms"], profile.db_ms)
+            stats["n_plus_one"] += bool(profile.repeated())
+            if profile.slowest and (stats["slowest"] is None or profile.slowest[0][0] > stats["slowest"]["ms"]):
+                ms, statement, site = profile.slowest[0]
+                stats["slowest"] = {"ms": round(ms, 1), "call_site": site, "statement": " ".join(statement.split())}
+
+    def top(self, n=20):
+        with self._lock:
+            ranked = sorted(self.routes.items(), key=lambda item: item[1]["db_ms"], reverse=True)[:n]
+            return [
+                {"route": route, **stats, "db_ms": round(stats["db_ms"], 1),
+                 "max_db_ms": round(stats["max_db_ms"], 1),
+                 "avg_queries": round(stats["queries"] / stats["requests"], 1)}
+                for route, stats in ranked
+            ]
+
+
+route_stats = RouteStats()
+
+
+def route_name(request):
+    route = request.scope.get("route")
+    return f"{request.method} {route.path if route else request.url.path}"
+
+
+class QueryProfilerMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        profile = QueryProfile(f"{request.method} {request.url.path}")
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            _current.reset(token)
+
+        profile.route = route_name(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        noun = "query" if profile.count == 1 else "queries"
+        response.headers["Server-Timing"] = (
+            f'db;dur={profile.db_ms:.1f};desc="{profile.count} {noun}", app;dur={total_ms:.1f}'
+        )
+        route_stats.add(profile)
+
+        repeated = profile.repeated()
+        if repeated:
+            logger.warning(json.dumps({
+                "event": "n_plus_one", "route": profile.route,
+                "repeats": sorted(repeated.values(), reverse=True),
+                "statement": " ".join(max(repeated, key=repeated.get).split()),
+            }))
+        return response
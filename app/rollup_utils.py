@@ -0,0 +1,173 @@
+import argparse
+import sys
+from datetime import date
+from sqlalchemy import Integer, cast, delete, extract, func, insert, select, tuple_, update
+from app.cache import bump_data_version
+from app.db_utils import dialect_insert
+from app.models import Expense, MonthlyCategoryTotal, User
+
+rollup = MonthlyCategoryTotal.__table__
+ROLLUP_KEY = ["user_id", "category_id", "year", "month", "type"]
+
+
+def _year_month(value):
+    # crud receives form dates as "YYYY-MM-DD" strings
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return value.year, value.month
+
+
+def transaction_delta(user_id, category_id, txn_date, type, amount, sign=1):
+    """Rollup delta for adding (sign=1) or removing (sign=-1) one transaction"""
+    year, month = _year_month(txn_date)
+    return {
+        "user_id": user_id, "category_id": category_id, "year": year, "month": month,
+        "type": type, "total": sign * amount, "count": sign,
+    }
+
+
+def apply_deltas(db, deltas):
+    """Add the given totals/counts to the rollup in the caller's transaction.
+
+    Deltas for the same key are merged first. Rows whose count drops to zero
+    are removed. Transactions without a category are not tracked.
+    """
+    merged = {}
+    for delta in deltas:
+        if delta["category_id"] is None:
+            continue
+        key = tuple(delta[col] for col in ROLLUP_KEY)
+        if key in merged:
+            merged[key]["total"] += delta["total"]
+            merged[key]["count"] += delta["count"]
+        else:
+            merged[key] = dict(delta)
+    if not merged:
+        return
+
+    stmt = dialect_insert(db, rollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=ROLLUP_KEY,
+        set_={
+            "total": rollup.c.total + stmt.excluded.total,
+            "count": rollup.c.count + stmt.excluded.count,
+        },
+    )
+    db.execute(stmt, list(merged.values()))
+
+    if any(delta["count"] < 0 for delta in merged.values()):
+        db.execute(delete(rollup).where(
+            rollup.c.count <= 0,
+            tuple_(*[rollup.c[col] for col in ROLLUP_KEY]).in_(list(merged.keys())),
+        ))
+
+
+def get_monthly_totals(db, user_id, *months, type="expense"):
+    """{(category_id, year, month): total} for the given (year, month) pairs"""
+    rows = db.query(
+        MonthlyCategoryTotal.category_id, MonthlyCategoryTotal.year,
+        MonthlyCategoryTotal.month, MonthlyCategoryTotal.total,
+    ).filter(
+        MonthlyCategoryTotal.user_id == user_id,
+        MonthlyCategoryTotal.type == type,
+        tuple_(MonthlyCategoryTotal.year, MonthlyCategoryTotal.month).in_(list(months)),
+    ).all()
+    return {(row.category_id, row.year, row.month): row.total for row in rows}
+
+
+def all_time_total(user_id, type):
+    """Scalar subquery: the user's all-time income or expense total.
+
+    The rollup cannot hold uncategorized expenses (category_id is part of its
+    key), so those are added from expenses; ix_expenses_user_category_date
+    makes that an index seek on (user_id, NULL).
+    """
+    tracked = select(func.coalesce(func.sum(rollup.c.total), 0)).where(
+        rollup.c.user_id == user_id, rollup.c.type == type,
+    ).scalar_subquery()
+    untracked = select(func.coalesce(func.sum(Expense.amount), 0)).where(
+        Expense.user_id == user_id, Expense.category_id == None, Expense.type == type,
+    ).scalar_subquery()
+    return tracked + untracked
+
+
+def _aggregate_expenses(user_id=None):
+    year = extract("year", Expense.date)
+    month = extract("month", Expense.date)
+    query = select(
+        Expense.user_id, Expense.category_id,
+        cast(year, Integer).label("year"),
+        cast(month, Integer).label("month"),
+        Expense.type,
+        func.sum(Expense.amount).label("total"),
+        func.count().label("count"),
+    ).where(Expense.category_id != None)
+    if user_id is not None:
+        query = query.where(Expense.user_id == user_id)
+    return query.group_by(Expense.user_id, Expense.category_id, year, month, Expense.type)
+
+
+def rebuild(conn, user_id=None, bump_versions=True):
+    """Recompute the rollup (for everyone, or one user) from raw expenses.
+
+    Bumps the data version of the users rebuilt, so their cached aggregates
+    are not served from before the rebuild (the migration that creates the
+    rollup runs before users.data_version exists and passes False).
+    """
+    query = delete(rollup)
+    if user_id is not None:
+        query = query.where(rollup.c.user_id == user_id)
+    conn.execute(query)
+    conn.execute(insert(rollup).from_select(
+        ["user_id", "category_id", "year", "month", "type", "total", "count"],
+        _aggregate_expenses(user_id),
+    ))
+    if not bump_versions:
+        return
+    if user_id is not None:
+        bump_data_version(conn, user_id)
+    else:
+        conn.execute(update(User).values(data_version=User.data_version + 1))
+
+
+def verify(conn, user_id=None, tolerance=0.005):
+    """Differences between the rollup and raw expenses as (key, expected, actual) tuples"""
+    expected = {
+        tuple(row[:5]): (row.total, row.count)
+        for row in conn.execute(_aggregate_expenses(user_id))
+    }
+    query = select(rollup)
+    if user_id is not None:
+        query = query.where(rollup.c.user_id == user_id)
+    actual = {
+        tuple(getattr(row, col) for col in ROLLUP_KEY): (row.total, row.count)
+        for row in conn.execute(query)
+    }
+
+    diffs = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        exp, act = expected.get(key, (0, 0)), actual.get(key, (0, 0))
+        if exp[1] != act[1] or abs(exp[0] - act[0]) > tolerance:
+            diffs.append((key, exp, act))
+    return diffs
+
+
+if __name__ == "__main__":
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description="Rebuild or verify the monthly_category_totals rollup")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    parser.add_argument("--user-id", type=int)
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        if args.command == "rebuild":
+            rebuild(conn, args.user_id)
+            print("rollup rebuilt")
+        else:
+            diffs = verify(conn, args.user_id)
+            for key, exp, act in diffs:
+                print(f"{dict(zip(ROLLUP_KEY, key))}: expected total={exp[0]} count={exp[1]}, "
+                      f"rollup total={act[0]} count={act[1]}")
+            print(f"{len(diffs)} differences")
+            sys.exit(1 if diffs else 0)
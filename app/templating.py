@@ -0,0 +1,81 @@
+# app/templating.py
+#
+# The one Jinja environment every router renders with:
+#   - compiled templates are kept in a bytecode cache on disk, so a restart
+#     loads bytecode instead of re-parsing (TEMPLATE_CACHE_DIR, default: a
+#     per-user directory under the system temp dir)
+#   - precompile() compiles every template at startup, so the first request
+#     to each page does not pay for it
+#   - templates are not re-checked for changes on disk unless
+#     TEMPLATE_AUTO_RELOAD=1 (development)
+#   - static_url("css/app.css") links an asset through the app/assets.py
+#     manifest (fingerprinted, long-lived caching)
+#   - {% cache "name", user_id, data_version %}...{% endcache %} stores the
+#     rendered block in the aggregate cache. Keys include every argument and
+#     today's date; a block is rendered uncached when the cache is off or any
+#     key argument is missing / None, so a page that does not pass
+#     data_version never serves stale HTML.
+
+import os
+from datetime import date
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Undefined, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from . import assets, cache
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR")
+TEMPLATE_AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", "0").lower() in ("1", "true", "yes")
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache key, ... %} body {% endcache %}"""
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        key = nodes.List(parts)
+        return nodes.CallBlock(
+            self.call_method("_render", [nodes.Const(parser.name), key]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, template, parts, caller):
+        store = cache.cache
+        if store is None or any(part is None or isinstance(part, Undefined) for part in parts):
+            return caller()
+        key = f"fragment:{template}:{date.today()}:{parts!r}"
+        found, html = store.get(key)
+        if not found:
+            html = str(caller())
+            store.set(key, html)
+        return Markup(html)
+
+
+def make_environment(bytecode_cache_dir=TEMPLATE_CACHE_DIR, auto_reload=TEMPLATE_AUTO_RELOAD):
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=True,
+        auto_reload=auto_reload,
+        bytecode_cache=FileSystemBytecodeCache(bytecode_cache_dir),
+        extensions=[FragmentCacheExtension],
+    )
+    env.globals["static_url"] = assets.static_url
+    return env
+
+
+templates = Jinja2Templates(env=make_environment())
+
+
+def precompile():
+    """Compile (or load from the bytecode cache) every template now"""
+    env = templates.env
+    for name in env.list_templates(extensions=("html",)):
+        env.get_template(name)
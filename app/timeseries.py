@@ -0,0 +1,253 @@
+# app/timeseries.py
+#
+# Income / expense time series bucketed by day, week (ISO, Monday start),
+# month, quarter or year. The database groups on bucket-start keys (date_trunc
+# on Postgres, date() modifiers on SQLite; month and coarser come from the
+# monthly rollup plus the uncategorized expenses it cannot hold) and the gaps
+# are zero-filled with one NumPy scatter-add, so the cost per chart point is
+# array arithmetic, not Python.
+#
+# Ranges are widened to whole buckets: a month bucket always covers the month.
+
+import calendar
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import Date, Integer, cast, extract, func, literal, select, tuple_, type_coerce, union_all
+
+from .models import Category, Expense, MonthlyCategoryTotal
+
+GRANULARITIES = ("day", "week", "month", "quarter", "year")
+
+# Months per bucket for the rollup-backed granularities
+MONTH_STEPS = {"month": 1, "quarter": 3, "year": 12}
+
+# Longest "last N buckets" window per granularity: about ten years each
+MAX_PERIODS = {"day": 3660, "week": 522, "month": 120, "quarter": 40, "year": 10}
+
+MONTH_ABBR = np.array(calendar.month_abbr)
+
+EPOCH = literal(date(1970, 1, 1), Date)
+
+
+def bucket_floor(d: date, granularity: str) -> date:
+    """Start of the bucket containing `d`"""
+    if granularity == "day":
+        return d
+    if granularity == "week":
+        return d - timedelta(days=d.weekday())
+    if granularity == "month":
+        return d.replace(day=1)
+    if granularity == "quarter":
+        return d.replace(month=(d.month - 1) // 3 * 3 + 1, day=1)
+    if granularity == "year":
+        return d.replace(month=1, day=1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def bucket_starts(granularity: str, from_date: date, to_date: date) -> np.ndarray:
+    """datetime64[D] start of every bucket overlapping [from_date, to_date]"""
+    first = np.datetime64(bucket_floor(from_date, granularity), "D")
+    last = np.datetime64(bucket_floor(to_date, granularity), "D")
+    if granularity in ("day", "week"):
+        step = 1 if granularity == "day" else 7
+        return np.arange(first, last + 1, step, dtype="datetime64[D]")
+    months = np.arange(first.astype("datetime64[M]"), last.astype("datetime64[M]") + 1,
+                       MONTH_STEPS[granularity])
+    return months.astype("datetime64[D]")
+
+
+def bucket_count(granularity: str, from_date: date, to_date: date) -> int:
+    """len(bucket_starts(...)) without building the array"""
+    first, last = bucket_floor(from_date, granularity), bucket_floor(to_date, granularity)
+    if granularity in ("day", "week"):
+        return (last - first).days // (1 if granularity == "day" else 7) + 1
+    months = (last.year - first.year) * 12 + last.month - first.month
+    return months // MONTH_STEPS[granularity] + 1
+
+
+def last_periods(granularity: str, periods: int, today: date = None):
+    """(from_date, to_date) spanning the last `periods` buckets up to today's"""
+    today = today or date.today()
+    current = np.datetime64(bucket_floor(today, granularity), "D")
+    if granularity in ("day", "week"):
+        step = 1 if granularity == "day" else 7
+        first = current - (periods - 1) * step
+    else:
+        first = (current.astype("datetime64[M]") - (periods - 1) * MONTH_STEPS[granularity]).astype("datetime64[D]")
+    if first < np.datetime64(date.min, "D"):
+        raise ValueError(f"{periods} {granularity} periods start before year 1")
+    return first.astype(date), today
+
+
+def bucket_end(start: date, granularity: str) -> date:
+    """Last day of the bucket starting at `start`"""
+    if granularity == "day":
+        return start
+    if granularity == "week":
+        return start + timedelta(days=6)
+    months = (np.datetime64(start, "M") + MONTH_STEPS[granularity]).astype("datetime64[D]")
+    return (months - 1).astype(date)
+
+
+def format_labels(starts: np.ndarray, granularity: str) -> list:
+    """Display labels: ISO dates for day / week, 'Jan 2024', 'Q1 2024', '2024'"""
+    if granularity in ("day", "week"):
+        return np.datetime_as_string(starts, unit="D").tolist()
+    months = starts.astype("datetime64[M]").astype(int)
+    years = (months // 12 + 1970).astype(str)
+    if granularity == "year":
+        return years.tolist()
+    if granularity == "quarter":
+        return np.char.add(np.char.add("Q", (months % 12 // 3 + 1).astype(str)), np.char.add(" ", years)).tolist()
+    return np.char.add(np.char.add(MONTH_ABBR[months % 12 + 1], " "), years).tolist()
+
+
+def _day_key(db, granularity, day):
+    """SQL bucket start of the `day` column, as days since 1970-01-01"""
+    if db.get_bind().dialect.name == "postgresql":
+        start = cast(func.date_trunc(granularity, day), Date)
+        return type_coerce(start - EPOCH, Integer)
+    start = day
+    if granularity == "week":
+        # Next Sunday (or today if Sunday), back six days: the ISO week's Monday
+        start = func.date(day, "weekday 0", "-6 days")
+    return cast(func.julianday(start) - 2440587.5, Integer)
+
+
+def _query_days(db, user_id, granularity, first, last, type, category):
+    # Sum per (date, type) first, so the bucket key is computed once per day, not per row
+    daily = db.query(
+        Expense.date.label("day"), Expense.type.label("type"), func.sum(Expense.amount).label("total")
+    ).filter(
+        Expense.user_id == user_id,
+        Expense.date >= first,
+        Expense.date <= last,
+    )
+    if type in ("income", "expense"):
+        daily = daily.filter(Expense.type == type)
+    if category:
+        daily = daily.join(Category).filter(Category.name == category)
+    daily = daily.group_by(Expense.date, Expense.type).subquery()
+
+    key = _day_key(db, granularity, daily.c.day).label("bucket")
+    rows = db.query(key, daily.c.type, func.sum(daily.c.total)).group_by(key, daily.c.type).all()
+    keys, types, totals = zip(*rows) if rows else ((), (), ())
+    return np.array(keys, dtype=np.int64).astype("datetime64[D]"), types, np.array(totals, dtype=float)
+
+
+def _query_months(db, user_id, granularity, first, last, type, category):
+    query = select(
+        MonthlyCategoryTotal.year, MonthlyCategoryTotal.month, MonthlyCategoryTotal.type,
+        func.sum(MonthlyCategoryTotal.total),
+    ).where(
+        MonthlyCategoryTotal.user_id == user_id,
+        tuple_(MonthlyCategoryTotal.year, MonthlyCategoryTotal.month) >= tuple_(first.year, first.month),
+        tuple_(MonthlyCategoryTotal.year, MonthlyCategoryTotal.month) <= tuple_(last.year, last.month),
+    )
+    if type in ("income", "expense"):
+        query = query.where(MonthlyCategoryTotal.type == type)
+    if category:
+        query = query.join(Category, Category.id == MonthlyCategoryTotal.category_id).where(Category.name == category)
+    query = query.group_by(MonthlyCategoryTotal.year, MonthlyCategoryTotal.month, MonthlyCategoryTotal.type)
+    if not category:
+        # The rollup cannot hold uncategorized expenses (category_id is part of
+        # its key); add them from expenses like the day / week series do
+        year = cast(extract("year", Expense.date), Integer)
+        month = cast(extract("month", Expense.date), Integer)
+        untracked = select(year, month, Expense.type, func.sum(Expense.amount)).where(
+            Expense.user_id == user_id,
+            Expense.category_id == None,
+            Expense.date >= first,
+            Expense.date <= last,
+        )
+        if type in ("income", "expense"):
+            untracked = untracked.where(Expense.type == type)
+        query = union_all(query, untracked.group_by(year, month, Expense.type))
+    rows = db.execute(query).all()
+    years, months, types, totals = zip(*rows) if rows else ((), (), (), ())
+
+    # Month index since 1970-01, floored to the quarter / year (both start in January)
+    months = (np.array(years, dtype=np.int64) - 1970) * 12 + np.array(months, dtype=np.int64) - 1
+    months -= months % MONTH_STEPS[granularity]
+    keys = months.astype("datetime64[M]").astype("datetime64[D]")
+    return keys, types, np.array(totals, dtype=float)
+
+
+def get_series(db, user_id: int, granularity: str, from_date: date, to_date: date,
+               type: str = None, category: str = None):
+    """Zero-filled income / expense / profit / loss arrays, one entry per bucket"""
+    starts = bucket_starts(granularity, from_date, to_date)
+    first = bucket_floor(from_date, granularity)
+    last = bucket_end(bucket_floor(to_date, granularity), granularity)
+
+    query = _query_months if granularity in MONTH_STEPS else _query_days
+    keys, types, totals = query(db, user_id, granularity, first, last, type, category)
+
+    income = np.zeros(len(starts))
+    expense = np.zeros(len(starts))
+    if len(keys):
+        index = np.searchsorted(starts, keys)
+        is_income = np.array(types) == "income"
+        np.add.at(income, index[is_income], totals[is_income])
+        np.add.at(expense, index[~is_income], totals[~is_income])
+
+    net = income - expense
+    return {
+        "starts": starts,
+        "income": income,
+        "expense": expense,
+        "profit": np.maximum(net, 0),
+        "loss": np.maximum(-net, 0),
+    }
+
+
+def lttb_indices(values: np.ndarray, n: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: `n` indices that keep the visual shape of `values`"""
+    size = len(values)
+    if n >= size or n < 3:
+        return np.arange(size)
+
+    x = np.arange(size, dtype=float)
+    edges = np.linspace(1, size - 1, n - 1).astype(int)  # n - 2 interior buckets
+    selected = np.empty(n, dtype=int)
+    selected[0], selected[-1] = 0, size - 1
+    previous = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        nxt_lo, nxt_hi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (size - 1, size)
+        avg_x, avg_y = x[nxt_lo:nxt_hi].mean(), values[nxt_lo:nxt_hi].mean()
+        area = np.abs(
+            (x[previous] - avg_x) * (values[lo:hi] - values[previous])
+            - (x[previous] - x[lo:hi]) * (avg_y - values[previous])
+        )
+        previous = lo + int(area.argmax())
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax_indices(values: np.ndarray, n: int) -> np.ndarray:
+    """Min and max index of each of n // 2 equal bins, in order"""
+    size = len(values)
+    if n >= size or n < 2:
+        return np.arange(size)
+
+    edges = np.linspace(0, size, n // 2 + 1).astype(int)
+    picked = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi > lo:
+            picked += [lo + int(values[lo:hi].argmin()), lo + int(values[lo:hi].argmax())]
+    return np.unique(picked)
+
+
+DOWNSAMPLERS = {"lttb": lttb_indices, "minmax": minmax_indices}
+
+
+def downsample(series: dict, max_points: int, method: str = "lttb", signal: str = "net") -> dict:
+    """Keep at most `max_points` buckets, chosen on one signal and applied to every array"""
+    if len(series["starts"]) <= max_points:
+        return series
+    values = series["income"] - series["expense"] if signal == "net" else series[signal]
+    index = DOWNSAMPLERS[method](values, max_points)
+    return {name: array[index] for name, array in series.items()}
@@ -0,0 +1,9 @@
+# benchmarks/__init__.py
+#
+# Benchmarks never touch the app database: DATABASE_URL is pointed at
+# BENCH_DATABASE_URL (a throwaway local SQLite file by default) before any
+# `app` module is imported. Use a scratch Postgres database for realistic plans.
+
+import os
+
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", "sqlite:///bench.db")
@@ -0,0 +1,94 @@
+# benchmarks/bench_assets.py
+#
+# Bytes and requests for the static assets of one dashboard view, first visit
+# and repeat visit, served as plain StaticFiles (source files, revalidated by
+# ETag every view) versus the app/assets.py build (fingerprinted, immutable,
+# pre-compressed). A repeat visit follows browser rules: a response with
+# max-age / immutable is reused without a request, anything else is
+# revalidated with If-None-Match.
+#
+#   python -m app.assets build
+#   python -m benchmarks.bench_assets css/style.css js/dashboard.js
+#
+# With no asset list every file under --static-dir counts as part of the view.
+
+import argparse
+import tempfile
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.staticfiles import StaticFiles
+
+from app import assets
+
+ACCEPT_ENCODING = "br, gzip, deflate"
+
+
+def cacheable(response):
+    cache_control = response.headers.get("cache-control", "")
+    return "immutable" in cache_control or ("max-age=" in cache_control and "max-age=0" not in cache_control)
+
+
+def view(client, urls, cache):
+    """(requests, body bytes) for one view; `cache` is the browser cache, {url: response}"""
+    requests = transferred = 0
+    for url in urls:
+        cached = cache.get(url)
+        if cached is not None and cacheable(cached):
+            continue
+        headers = {"Accept-Encoding": ACCEPT_ENCODING}
+        if cached is not None and "etag" in cached.headers:
+            headers["If-None-Match"] = cached.headers["etag"]
+        response = client.get(url, headers=headers)
+        assert response.status_code in (200, 304), (url, response.status_code)
+        requests += 1
+        if response.status_code == 200:
+            transferred += int(response.headers["content-length"])
+            cache[url] = response
+    return requests, transferred
+
+
+def measure(client, urls):
+    cache = {}
+    return view(client, urls, cache), view(client, urls, cache)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("assets", nargs="*", help="asset paths one dashboard view loads")
+    parser.add_argument("--static-dir", default=assets.STATIC_DIR)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as build_dir:
+        stats = assets.build(args.static_dir, build_dir)
+        if not stats:
+            parser.error(f"no assets under {args.static_dir}")
+        manifest = {source: target for source, target, _ in stats}
+        paths = args.assets or sorted(manifest)
+
+        plain = FastAPI()
+        plain.mount("/static", StaticFiles(directory=args.static_dir), name="static")
+        plain_urls = [f"/static/{path}" for path in paths]
+
+        # The build lives outside the source tree here, so mount it on its own
+        built = FastAPI()
+        built.mount("/static/build", assets.AssetFiles(directory=build_dir, build_dir=build_dir), name="static")
+        built_urls = [f"/static/build/{manifest[path]}" for path in paths]
+
+        results = {}
+        for name, app, urls in (("plain StaticFiles", plain, plain_urls), ("asset pipeline", built, built_urls)):
+            with TestClient(app) as client:
+                results[name] = measure(client, urls)
+
+    print(f"{len(paths)} assets per dashboard view"
+          + ("" if assets.brotli_available() else " (gzip only: brotli not installed)") + "\n")
+    print(f"{'':<20} {'first view':>22} {'repeat view':>22}")
+    print(f"{'':<20} {'requests':>10} {'bytes':>11} {'requests':>10} {'bytes':>11}")
+    for name, ((first_requests, first_bytes), (repeat_requests, repeat_bytes)) in results.items():
+        print(f"{name:<20} {first_requests:>10} {first_bytes:>11} {repeat_requests:>10} {repeat_bytes:>11}")
+    (_, before), (_, after) = results["plain StaticFiles"][0], results["asset pipeline"][0]
+    print(f"\nfirst view bytes -{(1 - after / before) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
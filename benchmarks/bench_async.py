@@ -0,0 +1,130 @@
+# benchmarks/bench_async.py
+#
+# Requests/s and p99 latency of the dashboard data path served by the sync
+# stack (def route + SessionLocal, threadpool) versus the async stack
+# (async def route + AsyncSession), at 50-500 concurrent clients.
+# Each stack runs in its own uvicorn process with the aggregate cache off.
+#
+#   python -m benchmarks.bench_async --levels 50 100 250 500 --seconds 10
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date
+
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import async_crud, crud
+from app.dashboard_utils import get_dashboard_summary
+from app.database import engine, get_async_db, get_db
+
+
+def _period():
+    today = date.today()
+    return today.replace(month=1, day=1), today
+
+
+sync_app = FastAPI()
+async_app = FastAPI()
+
+
+@sync_app.get("/dashboard-data")
+def sync_dashboard_data(user_id: int, db: Session = Depends(get_db)):
+    from_date, to_date = _period()
+    transactions = crud.get_filtered_transactions(user_id, "expense", from_date, to_date, db, limit=50)
+    summary = get_dashboard_summary(db, user_id, "expense", from_date, to_date)
+    return {"transactions": len(transactions), "income": summary["income"]}
+
+
+@async_app.get("/dashboard-data")
+async def async_dashboard_data(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    from_date, to_date = _period()
+    transactions = await async_crud.get_filtered_transactions(
+        user_id, "expense", from_date, to_date, db=db, limit=50
+    )
+    summary = await async_crud.get_dashboard_summary(
+        user_id=user_id, type="expense", from_date=from_date, to_date=to_date, db=db
+    )
+    return {"transactions": len(transactions), "income": summary["income"]}
+
+
+async def load(url, user_ids, concurrency, seconds):
+    import httpx
+
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        async def worker(n):
+            i = n
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get(url, params={"user_id": user_ids[i % len(user_ids)]})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                i += concurrency
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    p99 = statistics.quantiles(latencies, n=100)[98] * 1000 if len(latencies) > 1 else 0
+    return len(latencies) / elapsed, p99
+
+
+def wait_until_up(url, timeout=30):
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url.rsplit("/", 1)[0] + "/docs")
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--transactions", type=int, default=2_000)
+    parser.add_argument("--levels", type=int, nargs="+", default=[50, 100, 250, 500])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    from .seed import reset, seed
+
+    reset(engine)
+    user_ids = seed(engine, users=args.users, transactions_per_user=args.transactions)
+    env = dict(os.environ, CACHE_BACKEND="none")
+
+    print(f"{engine.dialect.name}: {args.users} users x {args.transactions} transactions\n")
+    print(f"{'stack':>6}  {'clients':>7}  {'req/s':>8}  {'p99 ms':>8}")
+    for name in ("sync", "async"):
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", f"benchmarks.bench_async:{name}_app",
+             "--port", str(args.port), "--log-level", "warning"],
+            env=env,
+        )
+        try:
+            url = f"http://127.0.0.1:{args.port}/dashboard-data"
+            wait_until_up(url)
+            for level in args.levels:
+                rps, p99 = asyncio.run(load(url, user_ids, level, args.seconds))
+                print(f"{name:>6}  {level:>7}  {rps:8.0f}  {p99:8.1f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_budgets.py
+#
+# Setting --categories x --months budgets: one select + insert/update +
+# commit per budget (how /categories/update/{id} used to save them) versus
+# category_utils.set_budgets (one INSERT ... ON CONFLICT DO UPDATE), plus
+# copying a month forward with one INSERT ... SELECT.
+#
+#   python -m benchmarks.bench_budgets --categories 20 --months 12
+
+import argparse
+import time
+from datetime import date
+
+from app.cache import bump_data_version
+from app.category_utils import copy_budgets_forward, month_range, set_budgets
+from app.database import SessionLocal, engine
+from app.date_utils import previous_month
+from app.models import Category, CategoryBudget
+
+from .query_count import count_queries
+from .seed import reset, seed
+
+
+def per_row(db, user_id, rows):
+    """The pre-batch path: a select and a commit for every budget"""
+    for category_id, year, month, budget in rows:
+        existing = db.query(CategoryBudget).filter_by(
+            category_id=category_id, user_id=user_id, month=month, year=year
+        ).first()
+        if existing:
+            existing.budget = budget
+        else:
+            db.add(CategoryBudget(category_id=category_id, user_id=user_id, month=month, year=year, budget=budget))
+        bump_data_version(db, user_id)
+        db.commit()
+
+
+def timed(func):
+    with SessionLocal() as db, count_queries(engine) as statements:
+        start = time.perf_counter()
+        func(db)
+        elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, len(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--categories", type=int, default=20, help="at most the seeded user's categories")
+    parser.add_argument("--months", type=int, default=12)
+    args = parser.parse_args()
+
+    reset(engine)
+    user_id = seed(engine, users=1, transactions_per_user=100, budget_months=0)[0]
+    with SessionLocal() as db:
+        category_ids = [id for (id,) in db.query(Category.id).filter(Category.user_id == user_id)]
+    category_ids = category_ids[:args.categories]
+    today = date.today()
+    first = (today.year, today.month)
+    for _ in range(args.months - 1):
+        first = previous_month(*first)
+    months = list(month_range(first, (today.year, today.month)))
+
+    print(f"{engine.dialect.name}: {len(category_ids)} categories x {len(months)} months\n")
+    for label, amount in (("insert", 100.0), ("update", 150.0)):
+        rows = [(category_id, year, month, amount) for category_id in category_ids for year, month in months]
+        for name, func in (("per budget", lambda db: per_row(db, user_id, rows)),
+                           ("set_budgets", lambda db: set_budgets(db, user_id, rows))):
+            with engine.begin() as conn:
+                conn.execute(CategoryBudget.__table__.delete())
+            if label == "update":
+                with SessionLocal() as db:
+                    set_budgets(db, user_id, [row[:3] + (1.0,) for row in rows])
+            ms, statements = timed(func)
+            print(f"{label} {len(rows):>5} budgets, {name:<12} {ms:9.2f} ms  {statements:>5} statements")
+
+    ms, statements = timed(lambda db: copy_budgets_forward(db, user_id, overwrite=True))
+    print(f"\ncopy last month forward, one INSERT ... SELECT  {ms:9.2f} ms  {statements:>5} statements")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_export.py
+#
+# Peak RSS and throughput of the CSV export: the streaming pipeline in
+# app/export_utils.py versus loading every Expense up front (the old path).
+# Each mode runs in a fresh subprocess so peak RSS is measured independently.
+#
+#   python -m benchmarks.bench_export --transactions 2000000
+
+import argparse
+import csv
+import resource
+import subprocess
+import sys
+import time
+from io import StringIO
+
+from app.database import engine
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def export_streaming(user_id):
+    from app.export_utils import iter_csv, iter_transaction_rows
+
+    size = 0
+    for chunk in iter_csv(iter_transaction_rows(user_id)):
+        size += len(chunk)
+    return size
+
+
+def export_legacy(user_id):
+    from app import crud
+    from app.database import SessionLocal
+
+    with SessionLocal() as db:
+        data = StringIO()
+        writer = csv.writer(data)
+        writer.writerow(["Date", "Type", "Category", "Amount", "Description"])
+        for txn in crud.get_all_transactions(user_id=user_id, db=db):
+            writer.writerow([txn.date, txn.type, txn.category.name, txn.amount, txn.description])
+        return len(data.getvalue())
+
+
+def run_mode(mode, user_id):
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    size = (export_streaming if mode == "stream" else export_legacy)(user_id)
+    elapsed = time.perf_counter() - start
+    print(f"{mode:>7}: {elapsed:7.2f} s  {size / 1e6:8.1f} MB csv  "
+          f"peak RSS {peak_rss_mb():7.1f} MB (+{peak_rss_mb() - baseline:.1f} MB over import)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=2_000_000)
+    parser.add_argument("--mode", choices=["stream", "legacy"])
+    parser.add_argument("--user-id", type=int)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.user_id)
+        return
+
+    from .seed import reset, seed
+
+    reset(engine)
+    user_id = seed(engine, users=1, transactions_per_user=args.transactions)[0]
+    print(f"{engine.dialect.name}: exporting {args.transactions} transactions")
+    for mode in ("stream", "legacy"):
+        subprocess.run([sys.executable, "-m", "benchmarks.bench_export",
+                        "--mode", mode, "--user-id", str(user_id)], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# benchmarks/bench_export_formats.py
+#
+# Throughput (rows/s) and output size of each export format, all fed by the
+# same streaming row source.
+#
+#   python -m benchmarks.bench_export_formats --transactions 1000000
+
+import argparse
+import time
+
+from app.database import engine
+from app.export_utils import EXPORT_FORMATS, encode_export, iter_transaction_rows, parquet_available
+
+from .seed import reset, seed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    reset(engine)
+    user_id = seed(engine, users=1, transactions_per_user=args.transactions)[0]
+
+    print(f"{engine.dialect.name}: {args.transactions} transactions\n")
+    print(f"{'format':>8}  {'seconds':>8}  {'rows/s':>10}  {'size MB':>8}")
+    for fmt in EXPORT_FORMATS:
+        if fmt == "parquet" and not parquet_available():
+            print(f"{fmt:>8}  skipped (pyarrow not installed)")
+            continue
+        start = time.perf_counter()
+        size = 0
+        for chunk in encode_export(fmt, iter_transaction_rows(user_id)):
+            size += len(chunk.encode() if isinstance(chunk, str) else chunk)
+        elapsed = time.perf_counter() - start
+        print(f"{fmt:>8}  {elapsed:8.2f}  {args.transactions / elapsed:10.0f}  {size / 1e6:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
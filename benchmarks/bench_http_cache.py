@@ -0,0 +1,89 @@
+# benchmarks/bench_http_cache.py
+#
+# Repeat visits to the heavy pages with app/http_cache.py: bytes on the wire,
+# CPU and SQL statements per request for a full response without compression,
+# with gzip (brotli when installed), and a revalidation that the conditional
+# GET answers with 304. CPU is process time of the in-process TestClient, so
+# it includes the (constant) client side.
+#
+#   python -m benchmarks.bench_http_cache --transactions 20000 --repeat 20
+
+import argparse
+import os
+import statistics
+import time
+
+from passlib.hash import bcrypt
+from sqlalchemy import update
+
+from app.database import engine
+from app.models import User
+
+from .seed import reset, seed
+
+PAGES = (
+    "/dashboard?type=all&period=year",
+    "/charts?period=year",
+    "/budget_overview",
+    "/categories",
+    "/api/transactions?limit=100",
+)
+
+
+def statements(response):
+    """Statement count from the profiler's Server-Timing `db` entry"""
+    for part in response.headers.get("server-timing", "").split(","):
+        if part.strip().startswith("db;") and 'desc="' in part:
+            return int(part.split('desc="')[1].split()[0])
+    return 0
+
+
+def measure(client, path, headers, repeat, status):
+    cpu, wire = [], 0
+    for _ in range(repeat):
+        start = time.process_time()
+        with client.stream("GET", path, headers=headers) as response:
+            # Raw (still compressed) body: the bytes on the wire
+            wire = sum(len(chunk) for chunk in response.iter_raw())
+        cpu.append((time.process_time() - start) * 1000)
+        assert response.status_code == status, (path, response.status_code)
+    return wire, statistics.median(cpu), statements(response)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.update(BCRYPT_ROUNDS="4", PASSWORD_HASH_WORKERS="0", SECRET_KEY="bench", QUERY_PROFILER="1",
+                      MIGRATE_ON_STARTUP="0")
+    from fastapi.testclient import TestClient
+
+    from app import http_cache
+    from app.main import app
+
+    reset(engine)
+    seed(engine, users=1, transactions_per_user=args.transactions, years=1)
+    with engine.begin() as conn:
+        conn.execute(update(User).values(password=bcrypt.using(rounds=4).hash("bench")))
+
+    encoding = "br" if http_cache.brotli_available() else "gzip"
+    print(f"{args.transactions} transactions, median of {args.repeat}, {encoding}\n")
+    print(f"{'page':<34} {'':>15} {'bytes':>9} {'cpu ms':>8} {'queries':>8}")
+    with TestClient(app) as client:
+        client.post("/login", data={"email": "bench0@example.com", "password": "bench"})
+        for path in PAGES:
+            etag = client.get(path).headers["etag"]
+            rows = (
+                ("identity", {"Accept-Encoding": "identity"}, 200),
+                (encoding, {"Accept-Encoding": encoding}, 200),
+                ("304 revalidate", {"Accept-Encoding": encoding, "If-None-Match": etag}, 304),
+            )
+            for label, headers, status in rows:
+                wire, cpu_ms, queries = measure(client, path, headers, args.repeat, status)
+                print(f"{path if label == 'identity' else '':<34} {label:>15} {wire:>9} {cpu_ms:>8.2f} {queries:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# benchmarks/bench_import.py
+#
+# Rows/s of the bulk CSV import (app/import_utils.py) against the old
+# one-add-one-commit-per-row path (crud.add_expense).
+#
+#   python -m benchmarks.bench_import --rows 100000
+
+import argparse
+import time
+from datetime import date
+from io import StringIO
+
+from app import crud
+from app.database import SessionLocal, engine
+from app.export_utils import iter_csv, iter_transaction_rows
+from app.import_utils import import_transactions
+
+from .seed import reset, seed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--legacy-rows", type=int, default=2_000)
+    args = parser.parse_args()
+
+    reset(engine)
+    source, target = seed(engine, users=2, transactions_per_user=args.rows)
+    csv_text = "".join(iter_csv(iter_transaction_rows(source)))
+
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        result = import_transactions(db, target, StringIO(csv_text, newline=""))
+        elapsed = time.perf_counter() - start
+    print(f"bulk import:   {result['imported']} rows in {elapsed:.2f} s "
+          f"({result['imported'] / elapsed:,.0f} rows/s), {result['error_count']} errors")
+
+    with SessionLocal() as db:
+        category_id = crud.get_all_categories(target, db)[0].id
+        start = time.perf_counter()
+        for _ in range(args.legacy_rows):
+            crud.add_expense(target, date(2024, 1, 1), category_id, 1.0, "bench", "expense", db)
+        elapsed = time.perf_counter() - start
+    print(f"add_expense:   {args.legacy_rows} rows in {elapsed:.2f} s "
+          f"({args.legacy_rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/bench_indexes.py
+#
+# Query plan + latency of the hot Expense query shapes with and without the
+# composite indexes from app/migrations.py.
+#
+#   python -m benchmarks.bench_indexes --users 20 --transactions 50000
+
+import argparse
+import statistics
+import time
+from datetime import date
+
+from sqlalchemy import and_, func, select
+
+from app import models
+from app.database import engine
+
+from .seed import reset, seed
+
+E = models.Expense.__table__
+C = models.Category.__table__
+
+
+def hot_queries(user_id, category_id):
+    today = date.today()
+    month_start = today.replace(day=1)
+    year_start = today.replace(month=1, day=1)
+    return {
+        "dashboard list (user, date range)": select(E).where(
+            E.c.user_id == user_id, E.c.date >= month_start, E.c.date <= today
+        ).order_by(E.c.date.desc()),
+        "pie (user, type, date range)": select(C.c.name, func.sum(E.c.amount)).join(C).where(
+            E.c.user_id == user_id, E.c.type == "expense",
+            E.c.date >= year_start, E.c.date <= today,
+        ).group_by(C.c.name),
+        "stats (user, type)": select(func.sum(E.c.amount)).where(
+            E.c.user_id == user_id, E.c.type == "income"
+        ),
+        "category month (user, category, date range)": select(func.sum(E.c.amount)).where(
+            and_(E.c.user_id == user_id, E.c.category_id == category_id,
+                 E.c.date >= month_start, E.c.date <= today)
+        ),
+    }
+
+
+def explain(conn, stmt):
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    rows = conn.exec_driver_sql(prefix + sql).all()
+    return [str(row[-1]) for row in rows]
+
+
+def measure(queries, repeat):
+    results = {}
+    with engine.connect() as conn:
+        for name, stmt in queries.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.execute(stmt).all()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = (statistics.median(timings), explain(conn, stmt))
+    return results
+
+
+def composite_indexes():
+    return [idx for idx in E.indexes if len(idx.columns) > 1]
+
+
+def analyze():
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    reset(engine)
+    user_ids = seed(engine, users=args.users, transactions_per_user=args.transactions)
+    with engine.connect() as conn:
+        category_id = conn.execute(
+            select(C.c.id).where(C.c.user_id == user_ids[0], C.c.type == "expense")
+        ).scalars().first()
+    queries = hot_queries(user_ids[0], category_id)
+
+    with engine.begin() as conn:
+        for idx in composite_indexes():
+            idx.drop(bind=conn, checkfirst=True)
+    analyze()
+    before = measure(queries, args.repeat)
+
+    with engine.begin() as conn:
+        for idx in composite_indexes():
+            idx.create(bind=conn, checkfirst=True)
+    analyze()
+    after = measure(queries, args.repeat)
+
+    print(f"{engine.dialect.name}: {args.users} users x {args.transactions} transactions\n")
+    for name in queries:
+        (t_before, plan_before), (t_after, plan_after) = before[name], after[name]
+        print(f"== {name}: {t_before:.2f} ms -> {t_after:.2f} ms (median of {args.repeat})")
+        print("   without indexes:", " | ".join(plan_before))
+        print("   with indexes:   ", " | ".join(plan_after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/bench_login.py
+#
+# Dashboard p99 latency while a login flood runs against the same server.
+# Configurations (each in its own uvicorn process):
+#   threadpool   bcrypt in the request threadpool (the previous behaviour)
+#   pool         bcrypt on the PASSWORD_HASH_WORKERS process pool
+#   pool+limits  the same with the per-IP / per-email admission limits
+#
+#   python -m benchmarks.bench_login --logins 32 --dashboards 16 --seconds 10
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from fastapi import FastAPI
+from starlette.middleware.sessions import SessionMiddleware
+
+from app import auth
+from app.database import engine
+
+from .bench_async import async_dashboard_data, wait_until_up
+
+login_app = FastAPI()
+login_app.add_middleware(SessionMiddleware, secret_key="bench")
+login_app.include_router(auth.router)
+login_app.get("/dashboard-data")(async_dashboard_data)
+
+CONFIGS = {
+    "threadpool": {"PASSWORD_HASH_WORKERS": "0", "PASSWORD_HASH_PER_IP": "100000", "PASSWORD_HASH_PER_EMAIL": "100000"},
+    "pool": {"PASSWORD_HASH_PER_IP": "100000", "PASSWORD_HASH_PER_EMAIL": "100000"},
+    "pool+limits": {},
+}
+
+
+async def flood(base, user_ids, logins, dashboards, seconds):
+    import httpx
+
+    latencies, statuses = [], []
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=logins + dashboards)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as client:
+        async def login_worker(n):
+            while time.perf_counter() < deadline:
+                response = await client.post("/login", data={
+                    "email": f"bench{n % len(user_ids)}@example.com", "password": "bench",
+                })
+                statuses.append(response.status_code)
+
+        async def dashboard_worker(n):
+            i = n
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get("/dashboard-data", params={"user_id": user_ids[i % len(user_ids)]})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                i += dashboards
+
+        await asyncio.gather(
+            *(login_worker(n) for n in range(logins)),
+            *(dashboard_worker(n) for n in range(dashboards)),
+        )
+
+    p99 = statistics.quantiles(latencies, n=100)[98] * 1000 if len(latencies) > 1 else 0
+    ok = sum(1 for status in statuses if status in (200, 302))
+    return p99, len(latencies) / seconds, ok / seconds, statuses.count(429)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=2_000)
+    parser.add_argument("--logins", type=int, default=32, help="concurrent login clients")
+    parser.add_argument("--dashboards", type=int, default=16, help="concurrent dashboard clients")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    from passlib.hash import bcrypt
+    from sqlalchemy import update
+
+    from app.models import User
+
+    from .seed import reset, seed
+
+    reset(engine)
+    user_ids = seed(engine, users=args.users, transactions_per_user=args.transactions)
+    with engine.begin() as conn:
+        conn.execute(update(User).values(password=bcrypt.using(rounds=args.rounds).hash("bench")))
+
+    base = f"http://127.0.0.1:{args.port}"
+    print(f"{args.logins} login clients + {args.dashboards} dashboard clients for {args.seconds:.0f} s, "
+          f"bcrypt rounds {args.rounds}, {os.cpu_count()} CPUs\n")
+    print(f"{'config':>12}  {'dash p99 ms':>11}  {'dash req/s':>10}  {'logins/s':>8}  {'429s':>6}")
+    for name, overrides in CONFIGS.items():
+        env = dict(os.environ, CACHE_BACKEND="none", BCRYPT_ROUNDS=str(args.rounds), **overrides)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "benchmarks.bench_login:login_app",
+             "--port", str(args.port), "--log-level", "warning"],
+            env=env,
+        )
+        try:
+            wait_until_up(f"{base}/dashboard-data")
+            p99, dash_rps, login_rps, rejected = asyncio.run(
+                flood(base, user_ids, args.logins, args.dashboards, args.seconds)
+            )
+            print(f"{name:>12}  {p99:11.1f}  {dash_rps:10.0f}  {login_rps:8.1f}  {rejected:>6}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# benchmarks/bench_metrics.py
+#
+# Overhead of app/metrics on the dashboard data path: the same async route
+# served by a bare app and by an app with MetricsMiddleware, on one engine
+# whose statement listeners are attached only for the metrics rounds
+# (aggregate cache off). Requests go straight to the ASGI callable, so no
+# transport cost hides the instrumentation; rounds alternate between the two
+# apps to cancel drift.
+#
+# The end-to-end difference is within run-to-run noise (a few percent on a
+# busy machine), so the gate is the measured cost of the instrumentation
+# itself: the per-request metric updates plus the engine listeners times the
+# statements each request issues, as a share of the bare request time. Exits
+# non-zero if that exceeds --max-overhead percent.
+#
+#   python -m benchmarks.bench_metrics --requests 300 --rounds 15
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import date
+from types import SimpleNamespace
+
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import async_crud, cache, metrics
+from app.database import DATABASE_URL, engine, make_async_engine
+
+from .query_count import count_queries
+
+
+bench_engine = make_async_engine(DATABASE_URL)
+sessions = async_sessionmaker(bench_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def get_session():
+    async with sessions() as db:
+        yield db
+
+
+async def dashboard_data(user_id: int, db: AsyncSession = Depends(get_session)):
+    today = date.today()
+    from_date = today.replace(month=1, day=1)
+    transactions = await async_crud.get_filtered_transactions(
+        user_id, "expense", from_date, today, db=db, limit=50
+    )
+    summary = await async_crud.get_dashboard_summary(
+        user_id=user_id, type="expense", from_date=from_date, to_date=today, db=db
+    )
+    return {"transactions": len(transactions), "income": summary["income"]}
+
+
+def dashboard_app(instrumented):
+    app = FastAPI()
+    app.get("/dashboard-data")(dashboard_data)
+    if instrumented:
+        app.add_middleware(metrics.MetricsMiddleware)
+    return app
+
+
+def instrument(on):
+    if on:
+        metrics.instrument_engine(bench_engine.sync_engine, "bench")
+    else:
+        metrics.uninstrument_engine(bench_engine.sync_engine)
+
+
+async def request(app, user_id):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/dashboard-data", "raw_path": b"/dashboard-data", "root_path": "",
+        "query_string": f"user_id={user_id}".encode(), "headers": [],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    assert status == 200, status
+
+
+async def run(apps, user_ids, requests, rounds):
+    """Median seconds per request for each app, and the median paired metrics / bare ratio"""
+    per_request = {name: [] for name in apps}
+    for name, app in apps.items():  # warm up connections and code paths
+        for user_id in user_ids[:10]:
+            await request(app, user_id)
+
+    for round in range(rounds):
+        order = list(apps.items()) if round % 2 == 0 else list(apps.items())[::-1]
+        for name, app in order:
+            instrument(name == "metrics")
+            start = time.perf_counter()
+            for i in range(requests):
+                await request(app, user_ids[i % len(user_ids)])
+            per_request[name].append((time.perf_counter() - start) / requests)
+    ratios = [m / b for m, b in zip(per_request["metrics"], per_request["bare"])]
+    return {name: statistics.median(times) for name, times in per_request.items()}, statistics.median(ratios)
+
+
+def per_call_us(func, n=100_000):
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def request_updates():
+    metrics.http_in_progress.inc("GET")
+    metrics.http_in_progress.dec("GET")
+    metrics.http_requests.inc("GET", "/dashboard-data", "200")
+    metrics.http_duration.observe(0.004, "GET", "/dashboard-data")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=2_000)
+    parser.add_argument("--requests", type=int, default=300, help="requests per round")
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--max-overhead", type=float, default=1.0, help="percent")
+    args = parser.parse_args()
+
+    from .seed import reset, seed
+
+    reset(engine)
+    user_ids = seed(engine, users=args.users, transactions_per_user=args.transactions)
+    cache.configure(None)
+
+    apps = {"bare": dashboard_app(False), "metrics": dashboard_app(True)}
+    medians, ratio = asyncio.run(run(apps, user_ids, args.requests, args.rounds))
+
+    with count_queries(bench_engine.sync_engine) as statements:
+        asyncio.run(request(apps["bare"], user_ids[0]))
+
+    # Cost of the instrumentation in isolation: the middleware's updates once
+    # per request, the engine listener pair once per statement
+    instrument(True)
+    conn = SimpleNamespace(info={}, engine=bench_engine.sync_engine)
+    dispatch = bench_engine.sync_engine.dispatch
+
+    def statement_listeners():
+        dispatch.before_cursor_execute(conn, None, "SELECT 1", (), None, False)
+        dispatch.after_cursor_execute(conn, None, "SELECT 1", (), None, False)
+
+    cost_us = per_call_us(request_updates) + len(statements) * per_call_us(statement_listeners)
+    overhead = cost_us / (medians["bare"] * 1e6) * 100
+
+    print(f"{engine.dialect.name}: {args.rounds} rounds x {args.requests} dashboard requests, "
+          f"{len(statements)} statements each\n")
+    for name, seconds in medians.items():
+        print(f"{name:>8}  {seconds * 1e6:8.0f} us/request")
+    print(f"\nend to end   {(ratio - 1) * 100:+.2f}% (median of paired rounds, includes noise)")
+    print(f"instrumented {cost_us:6.1f} us/request = {overhead:.2f}% of the bare request")
+
+    if overhead > args.max_overhead:
+        print(f"FAIL: instrumentation overhead above {args.max_overhead}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_pool.py
+#
+# Connection pool exhaustion under a request burst: each worker checks out a
+# connection, runs a query and holds it for --hold-ms (a slow request).
+# The default pool (5 + 10 overflow) runs out and checkouts time out after
+# --timeout seconds; the tuned pool absorbs the same burst.
+#
+#   python -m benchmarks.bench_pool --workers 60 --hold-ms 500 --timeout 1
+#
+# Against Postgres, keep pool_size + max_overflow below max_connections
+# (or put PgBouncer in front and set DB_NULLPOOL=1).
+
+import argparse
+import threading
+
+from sqlalchemy import exc, text
+
+from app.database import DATABASE_URL, make_engine
+from app.pool_metrics import PoolMetrics
+
+
+def burst(engine, workers, hold_ms):
+    metrics = PoolMetrics("bench", engine)
+    start = threading.Barrier(workers)
+
+    def worker():
+        start.wait()
+        try:
+            with metrics.timed_checkout():
+                conn = engine.connect()
+        except exc.TimeoutError:
+            return
+        with conn:
+            conn.execute(text("SELECT 1"))
+            threading.Event().wait(hold_ms / 1000)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return metrics
+
+
+def wait_percentile(metrics, fraction):
+    """Upper bucket bound (ms) below which `fraction` of checkouts waited"""
+    snapshot = metrics.snapshot()
+    total = sum(snapshot["wait_ms_buckets"].values())
+    seen = 0
+    for bound, count in snapshot["wait_ms_buckets"].items():
+        seen += count
+        if total and seen >= fraction * total:
+            return bound
+    return "-"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=60)
+    parser.add_argument("--hold-ms", type=float, default=500)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    parser.add_argument("--pool-size", type=int, default=30)
+    parser.add_argument("--max-overflow", type=int, default=40)
+    args = parser.parse_args()
+
+    configs = {
+        "default": dict(pool_size=5, max_overflow=10, pool_timeout=args.timeout),
+        "tuned": dict(pool_size=args.pool_size, max_overflow=args.max_overflow, pool_timeout=args.timeout),
+    }
+
+    print(f"{args.workers} concurrent workers holding a connection {args.hold_ms:.0f} ms, "
+          f"pool_timeout {args.timeout} s\n")
+    print(f"{'config':>8}  {'size+ovf':>8}  {'ok':>4}  {'timeouts':>8}  {'p50 wait':>8}  {'p99 wait':>8}")
+    for name, overrides in configs.items():
+        engine = make_engine(DATABASE_URL, **overrides)
+        try:
+            metrics = burst(engine, args.workers, args.hold_ms)
+        finally:
+            engine.dispose()
+        snapshot = metrics.snapshot()
+        ok = sum(snapshot["wait_ms_buckets"].values())
+        print(f"{name:>8}  {overrides['pool_size']:>3}+{overrides['max_overflow']:<4}  {ok:>4}  "
+              f"{snapshot['timeouts']:>8}  {wait_percentile(metrics, 0.5):>8}  "
+              f"{wait_percentile(metrics, 0.99):>8}")
+
+
+if __name__ == "__main__":
+    main()
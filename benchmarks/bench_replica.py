@@ -0,0 +1,122 @@
+# benchmarks/bench_replica.py
+#
+# Statements sent to the primary vs the read replica for a browsing session:
+# dashboard / charts / categories / budget overview / export / API reads,
+# with an occasional POST /add. Runs once without REPLICA_DATABASE_URL
+# (everything on the primary) and once with it, each in a fresh subprocess.
+#
+#   python -m benchmarks.bench_replica --requests 300 --write-every 25
+#
+# With the default SQLite URLs the replica is a file copy of the seeded
+# primary; for Postgres point --replica-url at a streaming replica.
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+from contextlib import ExitStack
+
+from app.database import DATABASE_URL, engine
+
+READ_PATHS = [
+    "/dashboard",
+    "/charts?period=month",
+    "/categories",
+    "/budget_overview",
+    "/export/csv",
+    "/api/transactions?limit=100",
+]
+
+
+def run_session(requests, write_every):
+    from fastapi.testclient import TestClient
+
+    from app import database
+    from app.main import app
+    from app.models import Category
+
+    from .query_count import count_queries
+
+    client = TestClient(app)
+    response = client.post("/login", data={"email": "bench0@example.com", "password": "bench"},
+                           follow_redirects=False)
+    assert response.status_code == 302, "login failed"
+    with database.SessionLocal() as db:
+        category_id = db.query(Category.id).filter(Category.type == "expense").first()[0]
+
+    primary = [database.engine, database.async_engine.sync_engine]
+    replica = [database.replica_engine, database.async_replica_engine.sync_engine]
+    if replica[0] is primary[0]:
+        replica = []
+
+    with ExitStack() as stack:
+        primary_statements = [stack.enter_context(count_queries(e)) for e in primary]
+        replica_statements = [stack.enter_context(count_queries(e)) for e in replica]
+        start = time.perf_counter()
+        writes = 0
+        for i in range(requests):
+            if write_every and i % write_every == write_every - 1:
+                client.post("/add", data={
+                    "date": "2024-01-01", "category": str(category_id), "amount": "1",
+                    "description": "bench", "type": "expense",
+                }, follow_redirects=False)
+                writes += 1
+            else:
+                client.get(READ_PATHS[i % len(READ_PATHS)]).raise_for_status()
+        elapsed = time.perf_counter() - start
+
+    on_primary = sum(map(len, primary_statements))
+    on_replica = sum(map(len, replica_statements))
+    print(f"{'replica' if replica else 'primary':>8}  {requests:>8}  {writes:>6}  {on_primary:>8}  "
+          f"{on_replica:>8}  {100 * on_primary / (on_primary + on_replica):>8.1f}%  {elapsed:>6.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--write-every", type=int, default=25)
+    parser.add_argument("--pin-seconds", type=float, default=0.1)
+    parser.add_argument("--replica-url", default=os.getenv("BENCH_REPLICA_DATABASE_URL",
+                                                           "sqlite:///bench_replica.db"))
+    parser.add_argument("--mode", choices=["primary", "replica"])
+    args = parser.parse_args()
+
+    if args.mode:
+        run_session(args.requests, args.write_every)
+        return
+
+    from passlib.hash import bcrypt
+    from sqlalchemy import update
+
+    from app.models import User
+
+    from .seed import reset, seed
+
+    reset(engine)
+    seed(engine, users=1, transactions_per_user=args.transactions)
+    with engine.begin() as conn:
+        conn.execute(update(User).values(password=bcrypt.hash("bench")))
+    engine.dispose()
+    if DATABASE_URL.startswith("sqlite:///") and args.replica_url.startswith("sqlite:///"):
+        shutil.copyfile(DATABASE_URL[len("sqlite:///"):], args.replica_url[len("sqlite:///"):])
+
+    print(f"{args.requests} requests, a write every {args.write_every}, "
+          f"reads pinned to the primary for {args.pin_seconds} s after a write\n")
+    print(f"{'config':>8}  {'requests':>8}  {'writes':>6}  {'primary':>8}  {'replica':>8}  "
+          f"{'primary%':>9}  {'time':>8}")
+    for mode in ("primary", "replica"):
+        env = dict(os.environ, CACHE_BACKEND="none", SECRET_KEY="bench",
+                   READ_PIN_SECONDS=str(args.pin_seconds))
+        env.pop("REPLICA_DATABASE_URL", None)
+        if mode == "replica":
+            env["REPLICA_DATABASE_URL"] = args.replica_url
+        subprocess.run([sys.executable, "-m", "benchmarks.bench_replica", "--mode", mode,
+                        "--requests", str(args.requests), "--write-every", str(args.write_every)],
+                       env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
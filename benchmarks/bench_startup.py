@@ -0,0 +1,90 @@
+# benchmarks/bench_startup.py
+#
+# Worker boot time: `import app.main` and the lifespan startup (engines,
+# template compile, plus the migrations check with MIGRATE_ON_STARTUP=1),
+# each in a fresh interpreter as a uvicorn worker would start, plus the
+# slowest modules from `-X importtime`.
+#
+#   python -m benchmarks.bench_startup --runs 10 --top 15 --out startup.json
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from app.database import engine
+from app.migrations import migrate
+
+BOOT = """
+import asyncio, json, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def startup():
+    async with app.main.lifespan(app.main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(startup())
+print(json.dumps({"import_ms": (imported - start) * 1000, "startup_ms": (ready - imported) * 1000}))
+"""
+
+
+def boot_once(env):
+    output = subprocess.check_output([sys.executable, "-c", BOOT], env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_profile(env):
+    """{module: (self us, cumulative us)} from one `-X importtime` run"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                            env=env, capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--out", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    # Schema in place first, so startup measures the "nothing to migrate" path
+    migrate(engine)
+    env = dict(os.environ, PYTHONPATH=os.getcwd() + os.pathsep + os.environ.get("PYTHONPATH", ""))
+
+    runs = [boot_once(env) for _ in range(args.runs)]
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    startup_ms = statistics.median(run["startup_ms"] for run in runs)
+
+    print(f"{engine.dialect.name}: median of {args.runs} fresh interpreters\n")
+    print(f"import app.main   {import_ms:8.1f} ms")
+    print(f"lifespan startup  {startup_ms:8.1f} ms")
+    print(f"worker boot       {import_ms + startup_ms:8.1f} ms")
+
+    modules = import_profile(env)
+    slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    print(f"\nslowest modules by own import time, top {args.top}")
+    print(f"  {'self ms':>8}  {'cumul ms':>8}  module")
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"  {self_us / 1000:8.1f}  {cumulative_us / 1000:8.1f}  {name}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "import_ms": round(import_ms, 1), "startup_ms": round(startup_ms, 1),
+                "runs": runs,
+                "imports": {name: {"self_ms": s / 1000, "cumulative_ms": c / 1000} for name, (s, c) in slowest},
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
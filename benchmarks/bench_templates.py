@@ -0,0 +1,99 @@
+# benchmarks/bench_templates.py
+#
+# dashboard.html with --transactions rows (ORM objects, as the route passes
+# them): time to load the templates from source versus from the bytecode
+# cache, the steady-state render time, and a 5k-row block rendered through
+# {% cache %} with and without a warm fragment cache.
+#
+#   python -m benchmarks.bench_templates --transactions 5000
+
+import argparse
+import statistics
+import tempfile
+import time
+from datetime import date
+
+from starlette.requests import Request
+
+from app import cache, crud, templating
+from app.cache import AggregateCache, MemoryBackend
+from app.dashboard_utils import get_dashboard_summary
+from app.database import SessionLocal, engine
+
+from .seed import reset, seed
+
+FRAGMENT = (
+    "{% cache 'transactions', user_id, data_version %}"
+    "{% for t in transactions %}<tr><td>{{ t.date }}</td><td>{{ t.category.name }}</td>"
+    "<td>{{ '%.2f'|format(t.amount) }}</td><td>{{ t.description }}</td></tr>{% endfor %}"
+    "{% endcache %}"
+)
+
+
+def median_ms(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def load_ms(env):
+    """Time to load every template into a fresh environment"""
+    start = time.perf_counter()
+    for name in env.list_templates(extensions=("html",)):
+        env.get_template(name)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from app.main import app
+
+    reset(engine)
+    user_id = seed(engine, users=1, transactions_per_user=args.transactions, years=1)[0]
+    today = date.today()
+    with SessionLocal() as db:
+        transactions = crud.get_filtered_transactions(
+            user_id, "all", today.replace(year=today.year - 1), today, db, limit=args.transactions
+        )
+        summary = get_dashboard_summary(db, user_id, "expense", today.replace(month=1, day=1), today)
+
+    request = Request({"type": "http", "app": app, "router": app.router, "method": "GET",
+                       "path": "/dashboard", "query_string": b"", "headers": [], "root_path": ""})
+    context = {
+        "request": request, "transactions": transactions, "labels": summary["labels"],
+        "values": summary["values"], "progress_data": summary["progress_data"],
+        "all_categories": summary["all_categories"], "type": "all", "period": "year",
+        "total_amount": summary["income"] - summary["expense"], "user_id": user_id, "data_version": 1,
+    }
+
+    print(f"dashboard.html with {len(transactions)} transactions\n")
+    with tempfile.TemporaryDirectory() as bytecode_dir:
+        cold = load_ms(templating.make_environment(bytecode_dir))
+        warm = load_ms(templating.make_environment(bytecode_dir))
+    print(f"load all templates, from source      {cold:8.2f} ms")
+    print(f"load all templates, bytecode cache   {warm:8.2f} ms")
+
+    env = templating.templates.env
+    templating.precompile()
+    page = env.get_template("dashboard.html")
+    print(f"render, precompiled                  {median_ms(lambda: page.render(context), args.repeat):8.2f} ms")
+
+    fragment = env.from_string(FRAGMENT)
+    cache.configure(None)
+    uncached = median_ms(lambda: fragment.render(context), args.repeat)
+    cache.configure(AggregateCache(MemoryBackend()))
+    fragment.render(context)
+    cached = median_ms(lambda: fragment.render(context), args.repeat)
+    print(f"\n{len(transactions)}-row block, fragment cache off  {uncached:8.2f} ms")
+    print(f"{len(transactions)}-row block, fragment cache hit  {cached:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_timeseries.py
+#
+# Latency of app/timeseries.get_series for multi-year charts at every
+# granularity (SQL grouping + NumPy zero-fill + labels), then the /api/series
+# payload (crud.get_chart_series, downsampled to --max-points) cold and cached.
+#
+#   python -m benchmarks.bench_timeseries --years 10 --transactions 200000
+
+import argparse
+import statistics
+import time
+from datetime import date
+
+from app import cache, crud, timeseries
+from app.cache import AggregateCache, MemoryBackend
+from app.database import SessionLocal, engine
+
+from .seed import reset, seed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--transactions", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-points", type=int, default=1000)
+    args = parser.parse_args()
+
+    reset(engine)
+    user_id = seed(engine, users=1, transactions_per_user=args.transactions, years=args.years)[0]
+    today = date.today()
+    from_date = today.replace(year=today.year - args.years)
+
+    print(f"{engine.dialect.name}: {args.transactions} transactions over {args.years} years\n")
+    print(f"{'granularity':>11}  {'points':>6}  {'median ms':>9}  {'p95 ms':>8}")
+    with SessionLocal() as db:
+        for granularity in timeseries.GRANULARITIES:
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                series = timeseries.get_series(db, user_id, granularity, from_date, today)
+                timeseries.format_labels(series["starts"], granularity)
+                timings.append((time.perf_counter() - start) * 1000)
+            p95 = statistics.quantiles(timings, n=20)[18]
+            print(f"{granularity:>11}  {len(series['starts']):>6}  {statistics.median(timings):9.1f}  {p95:8.1f}")
+
+        print(f"\n/api/series payload, daily, max_points={args.max_points}")
+        for label, backend in (("cold", None), ("cached", AggregateCache(MemoryBackend()))):
+            cache.configure(backend)
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                crud.get_chart_series(user_id, "day", from_date, today, db, max_points=args.max_points)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{label:>11}  median {statistics.median(timings):6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_transactions_api.py
+#
+# Per-page latency of the keyset-paginated transaction listing at increasing
+# depths of a single large history, compared with LIMIT/OFFSET paging.
+#
+#   python -m benchmarks.bench_transactions_api --transactions 1000000
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import select
+
+from app import crud
+from app.database import SessionLocal, engine
+from app.models import Expense
+
+from .seed import reset, seed
+
+PAGE = 50
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    reset(engine)
+    user_id = seed(engine, users=1, transactions_per_user=args.transactions)[0]
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+    depths = [0, 1_000, 10_000, 100_000, args.transactions // 2, args.transactions - PAGE]
+    print(f"{engine.dialect.name}: 1 user x {args.transactions} transactions, page size {PAGE}\n")
+    print(f"{'offset':>10}  {'keyset ms':>10}  {'OFFSET ms':>10}")
+
+    with SessionLocal() as db:
+        for depth in sorted(d for d in set(depths) if 0 <= d < args.transactions):
+            cursor = None
+            if depth:
+                row = db.execute(
+                    select(Expense.date, Expense.id).where(Expense.user_id == user_id)
+                    .order_by(Expense.date.desc(), Expense.id.desc()).offset(depth - 1).limit(1)
+                ).one()
+                cursor = (row.date, row.id)
+
+            keyset = timed(lambda: crud.get_transaction_page(
+                user_id, db, cursor=cursor, limit=PAGE + 1
+            ), args.repeat)
+            offset = timed(lambda: crud.filter_transactions(
+                db.query(Expense.id, Expense.date, Expense.amount).join(Expense.category), user_id
+            ).order_by(Expense.date.desc(), Expense.id.desc()).offset(depth).limit(PAGE + 1).all(),
+                args.repeat)
+            print(f"{depth:>10}  {keyset:>10.2f}  {offset:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
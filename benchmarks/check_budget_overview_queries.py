@@ -0,0 +1,74 @@
+# benchmarks/check_budget_overview_queries.py
+#
+# Query-count regression check for the /budget_overview data path, sync and
+# the async route's two concurrent sessions, with the aggregate cache off and
+# on. Exits non-zero if any run goes over its statement budget.
+#
+#   python -m benchmarks.check_budget_overview_queries
+
+import asyncio
+import sys
+
+from app import async_crud, database
+from app.budget_overview_util import load_budget_overview
+from app.cache import AggregateCache, MemoryBackend, configure
+from app.database import SessionLocal, engine
+
+from .query_count import count_queries
+from .seed import reset, seed
+
+# categories + budgets + monthly spending, selected category's daily spending
+BUDGET_OVERVIEW_QUERY_BUDGET = 2
+# the user's data version lookup
+BUDGET_OVERVIEW_CACHED_QUERY_BUDGET = 1
+# async route, cache on: one data version lookup shared by both sessions
+ASYNC_QUERY_BUDGET = BUDGET_OVERVIEW_QUERY_BUDGET + 1
+ASYNC_CACHED_QUERY_BUDGET = 1
+
+
+async def load_async(user_id):
+    async with database.AsyncSessionLocal() as db:
+        return await async_crud.load_budget_overview(user_id, "Food", db=db)
+
+
+def count_async(user_id):
+    with count_queries(database.async_engine.sync_engine) as statements:
+        asyncio.run(load_async(user_id))
+    return statements
+
+
+def main():
+    reset(engine)
+    user_id = seed(engine, users=2, transactions_per_user=2_000)[0]
+
+    configure(None)
+    with SessionLocal() as db, count_queries(engine) as cold:
+        data = load_budget_overview(db, user_id, "Food")
+    assert data["overview_data"] and data["chart_data"]["labels"]
+
+    configure(AggregateCache(MemoryBackend()))
+    with SessionLocal() as db:
+        load_budget_overview(db, user_id, "Food")
+    with SessionLocal() as db, count_queries(engine) as warm:
+        load_budget_overview(db, user_id, "Food")
+
+    configure(AggregateCache(MemoryBackend()))
+    async_cold = count_async(user_id)
+    async_warm = count_async(user_id)
+
+    print(f"budget overview: {len(cold)} queries, cached: {len(warm)} queries")
+    print(f"async, cache on: {len(async_cold)} queries, cached: {len(async_warm)} queries")
+    failed = False
+    for label, statements, budget in (("uncached", cold, BUDGET_OVERVIEW_QUERY_BUDGET),
+                                      ("cached", warm, BUDGET_OVERVIEW_CACHED_QUERY_BUDGET),
+                                      ("async uncached", async_cold, ASYNC_QUERY_BUDGET),
+                                      ("async cached", async_warm, ASYNC_CACHED_QUERY_BUDGET)):
+        if len(statements) > budget:
+            print(f"FAIL: {label} budget overview issues {len(statements)} queries (budget {budget})")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
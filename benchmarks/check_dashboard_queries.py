@@ -0,0 +1,79 @@
+# benchmarks/check_dashboard_queries.py
+#
+# Query-count regression check for the /dashboard data path. Exits non-zero
+# if the page needs more than DASHBOARD_QUERY_BUDGET statements.
+#
+#   python -m benchmarks.check_dashboard_queries
+
+import sys
+from datetime import date
+
+from app import crud
+from app.budget_utils import get_budget_progress
+from app.cache import AggregateCache, MemoryBackend, configure
+from app.dashboard_utils import get_dashboard_summary
+from app.database import SessionLocal, engine
+
+from .query_count import count_queries
+from .seed import reset, seed
+
+# transactions list + the two summary statements
+DASHBOARD_QUERY_BUDGET = 3
+# transactions list + the user's data version lookup
+DASHBOARD_CACHED_QUERY_BUDGET = 2
+
+
+def legacy_dashboard(db, user_id, type, from_date, to_date):
+    crud.get_filtered_transactions(user_id, type, from_date, to_date, db)
+    crud.get_stats(user_id, db)
+    crud.get_pie_chart_data_filtered(user_id, type, from_date, to_date, db)
+    get_budget_progress(db, user_id)
+    crud.get_all_categories(user_id, db)
+
+
+def dashboard(db, user_id, type, from_date, to_date):
+    crud.get_filtered_transactions(user_id, type, from_date, to_date, db)
+    return get_dashboard_summary(db, user_id, type, from_date, to_date)
+
+
+def main():
+    reset(engine)
+    user_id = seed(engine, users=2, transactions_per_user=2_000)[0]
+    today = date.today()
+    args = (user_id, "expense", today.replace(month=1, day=1), today)
+
+    # Cold path: aggregate cache disabled
+    configure(None)
+    with SessionLocal() as db, count_queries(engine) as legacy:
+        legacy_dashboard(db, *args)
+    with SessionLocal() as db:
+        with count_queries(engine) as current:
+            summary = dashboard(db, *args)
+        income, expense, _ = crud.get_stats(user_id, db)
+        assert round(summary["income"], 2) == round(income, 2)
+        assert round(summary["expense"], 2) == round(expense, 2)
+        assert summary["progress_data"] == get_budget_progress(db, user_id)
+        pie = crud.get_pie_chart_data_filtered(*args, db)
+        assert sorted(zip(pie["labels"], pie["data"])) == sorted(zip(summary["labels"], summary["values"]))
+
+    # Warm path: summary served from the aggregate cache
+    configure(AggregateCache(MemoryBackend()))
+    with SessionLocal() as db:
+        dashboard(db, *args)
+    with SessionLocal() as db, count_queries(engine) as warm:
+        dashboard(db, *args)
+
+    print(f"legacy dashboard: {len(legacy)} queries, current: {len(current)} queries, "
+          f"cached: {len(warm)} queries")
+    failed = False
+    for label, statements, budget in (("uncached", current, DASHBOARD_QUERY_BUDGET),
+                                      ("cached", warm, DASHBOARD_CACHED_QUERY_BUDGET)):
+        if len(statements) > budget:
+            print(f"FAIL: {label} dashboard issues {len(statements)} queries (budget {budget})")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/check_month_window.py
+#
+# Correctness and plan check for date_utils.month_window: for single,
+# adjacent (including December -> January), and non-adjacent months, the
+# range predicate must select exactly the rows the old extract('year' /
+# 'month') filters did, and EXPLAIN must show an expenses index range scan
+# on date. Exits non-zero on any mismatch.
+#
+#   python -m benchmarks.check_month_window
+
+import re
+import sys
+from datetime import date
+
+from sqlalchemy import and_, extract, func, insert, or_, select, text
+
+from app.database import engine
+from app.date_utils import month_window
+from app.models import Category, Expense
+
+from .seed import reset, seed
+
+
+def extract_filter(column, *months):
+    """The predicate month_window replaced"""
+    return or_(*[and_(extract("year", column) == y, extract("month", column) == m) for y, m in months])
+
+
+def explain(conn, stmt):
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "sqlite":
+        return "\n".join(row.detail for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql)))
+    # Tiny tables would otherwise make a sequential scan the cheapest plan
+    conn.execute(text("SET enable_seqscan = off"))
+    return "\n".join(row[0] for row in conn.execute(text("EXPLAIN " + sql)))
+
+
+def main():
+    reset(engine)
+    user_id = seed(engine, users=2, transactions_per_user=2_000, years=2)[0]
+    year = date.today().year - 1
+    # Rows on both sides of every month edge the cases below touch
+    edges = [date(year - 1, 11, 30), date(year - 1, 12, 1), date(year - 1, 12, 31), date(year, 1, 1),
+             date(year, 1, 31), date(year, 2, 1), date(year, 2, 28), date(year, 3, 1), date(year, 3, 31)]
+    with engine.begin() as conn:
+        category_id = conn.execute(select(Category.id).where(Category.user_id == user_id)).scalars().first()
+        conn.execute(insert(Expense), [
+            {"user_id": user_id, "category_id": category_id, "date": d, "type": "expense",
+             "amount": 1.0, "description": "edge"} for d in edges
+        ])
+
+    cases = {
+        "single month": [(year, 6)],
+        "December -> January": [(year - 1, 12), (year, 1)],
+        "non-adjacent": [(year, 1), (year, 3)],
+        "three across the year end": [(year - 1, 11), (year - 1, 12), (year, 1)],
+    }
+    failed = False
+    with engine.connect() as conn:
+        for label, months in cases.items():
+            base = select(Expense.id).where(Expense.user_id == user_id)
+            new = set(conn.execute(base.where(month_window(Expense.date, *months))).scalars())
+            old = set(conn.execute(base.where(extract_filter(Expense.date, *months))).scalars())
+            status = "ok" if new == old and new else "MISMATCH"
+            print(f"{label:<28} {len(new):>5} rows (extract: {len(old)})  {status}")
+            failed |= status != "ok"
+
+        stmt = select(func.sum(Expense.amount)).where(
+            Expense.user_id == user_id, month_window(Expense.date, *cases["December -> January"])
+        )
+        plan = explain(conn, stmt)
+        print(f"\nEXPLAIN month_window (December -> January):\n{plan}")
+        if not re.search(r"ix_expenses_user\w*", plan) or not re.search(r"date\s*>", plan):
+            print("FAIL: month_window is not an index range scan on expenses.date")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/compare.py
+#
+# Compare two benchmarks/suite.py reports. Flags a regression when p50 or p95
+# grows by more than --threshold percent (and --min-ms), or when a case issues
+# more statements than before; exits non-zero if any case regressed.
+#
+#   python -m benchmarks.compare benchmarks/results/abc123.json benchmarks/results/def456.json
+
+import argparse
+import json
+import sys
+
+METRICS = ("p50", "p95")
+
+
+def compare_section(name, old, new, threshold, min_ms):
+    regressions = []
+    print(f"\n{name}")
+    print(f"{'case':<48} {'p50 old':>9} {'p50 new':>9} {'p95 old':>9} {'p95 new':>9} {'queries':>9}")
+    for case in sorted(set(old) | set(new)):
+        if case not in old or case not in new:
+            print(f"{case:<48} {'only in ' + ('new' if case in new else 'old'):>49}")
+            continue
+        before, after = old[case], new[case]
+        flags = []
+        for metric in METRICS:
+            a, b = before.get(metric), after.get(metric)
+            if a and b and b - a > min_ms and (b / a - 1) * 100 > threshold:
+                flags.append(f"{metric} +{(b / a - 1) * 100:.0f}%")
+        q_old, q_new = before.get("queries"), after.get("queries")
+        if q_old is not None and q_new is not None and q_new > q_old:
+            flags.append(f"queries {q_old} -> {q_new}")
+
+        print(f"{case:<48} {before.get('p50') or 0:9.2f} {after.get('p50') or 0:9.2f} "
+              f"{before.get('p95') or 0:9.2f} {after.get('p95') or 0:9.2f} "
+              f"{str(q_old) + '->' + str(q_new):>9}  {'REGRESSION: ' + ', '.join(flags) if flags else ''}")
+        if flags:
+            regressions.append((name, case, flags))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10, help="percent slowdown to flag")
+    parser.add_argument("--min-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')} "
+          f"({old['meta'].get('database')} / {new['meta'].get('database')})")
+    data_set = ("users", "transactions", "years", "seed")
+    if [old["meta"]["args"].get(k) for k in data_set] != [new["meta"]["args"].get(k) for k in data_set]:
+        print("warning: the runs used different data sets")
+
+    regressions = []
+    for section in ("micro", "http"):
+        if section in old and section in new:
+            regressions += compare_section(section, old[section], new[section], args.threshold, args.min_ms)
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
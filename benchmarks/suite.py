@@ -0,0 +1,266 @@
+# benchmarks/suite.py
+#
+# Reproducible benchmark run, written to JSON so commits can be compared
+# (see benchmarks/compare.py):
+#   micro  every read path in crud / budget_utils / budget_overview_util /
+#          dashboard_utils / category_utils, plus the add / delete write path,
+#          in-process with the aggregate cache off: p50 / p95 / p99 ms and
+#          statements per call
+#   http   uvicorn serving app.main; logged-in clients hit /dashboard,
+#          /charts, /budget_overview and /export/csv in a weighted mix:
+#          p50 / p95 / p99 ms, requests/s, errors and statements per request
+#          (from the Server-Timing header; streamed export rows not counted)
+#
+# The data set is seeded from a fixed RNG seed, so runs with the same
+# arguments and database see the same rows. Use BENCH_DATABASE_URL for a
+# scratch Postgres database.
+#
+#   python -m benchmarks.suite --users 20 --transactions 5000 --out results/HEAD.json
+#   python -m benchmarks.suite --skip-http
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import date
+
+from passlib.hash import bcrypt
+from sqlalchemy import func, update
+
+from app import budget_overview_util, cache, crud
+from app.budget_utils import get_budget_progress
+from app.category_utils import get_all_categories_with_budget
+from app.dashboard_utils import get_dashboard_summary
+from app.database import SessionLocal, engine
+from app.models import Category, Expense, User
+
+from .bench_async import wait_until_up
+from .query_count import count_queries
+from .seed import reset, seed
+
+HTTP_MIX = {
+    "/dashboard": 4,
+    "/charts?period=month": 2,
+    "/budget_overview?category=Food": 2,
+    "/export/csv": 1,
+}
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) quer')
+
+
+def percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {"p50": None, "p95": None, "p99": None}
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+def micro_cases(db, user_id):
+    """(name, zero-argument callable) for every function worth timing"""
+    today = date.today()
+    year_start = today.replace(month=1, day=1)
+    # Plain values, not ORM objects: the runner expires the session between calls
+    category_id, category_name = db.query(Category.id, Category.name).filter(
+        Category.user_id == user_id, Category.type == "expense"
+    ).first()
+    txn_id = db.query(func.min(Expense.id)).filter(Expense.user_id == user_id).scalar()
+    categories = budget_overview_util.load_category_budgets(db, user_id)
+    daily = budget_overview_util.load_daily_spending(db, user_id, category_name)
+
+    def add_and_delete():
+        crud.add_expense(user_id, today, category_id, 12.5, "bench", "expense", db)
+        added = db.query(func.max(Expense.id)).filter(Expense.user_id == user_id).scalar()
+        crud.delete_transaction(db, added)
+
+    return [
+        ("crud.get_filtered_transactions", lambda: crud.get_filtered_transactions(
+            user_id, "expense", year_start, today, db, limit=50)),
+        ("crud.get_transaction_page", lambda: crud.get_transaction_page(user_id, db, type="expense")),
+        ("crud.get_transaction_by_id", lambda: crud.get_transaction_by_id(db, txn_id, user_id)),
+        ("crud.get_stats", lambda: crud.get_stats(user_id, db)),
+        ("crud.get_pie_chart_data_filtered", lambda: crud.get_pie_chart_data_filtered(
+            user_id, "expense", year_start, today, db)),
+        ("crud.get_all_categories", lambda: crud.get_all_categories(user_id, db)),
+        ("crud.get_category_by_id", lambda: crud.get_category_by_id(db, category_id)),
+        ("crud.get_summary_by_period.month", lambda: crud.get_summary_by_period(user_id, "month", None, db)),
+        ("crud.get_summary_by_period.day", lambda: crud.get_summary_by_period(
+            user_id, "day", None, db, periods=365)),
+        ("crud.get_chart_series.day", lambda: crud.get_chart_series(
+            user_id, "day", today.replace(year=today.year - 3), today, db, max_points=500)),
+        ("crud.get_all_monthly_budgets_for_user", lambda: crud.get_all_monthly_budgets_for_user(db, user_id)),
+        ("crud.get_all_transactions", lambda: crud.get_all_transactions(user_id, db)),
+        ("crud.add_expense+delete_transaction", add_and_delete),
+        ("budget_utils.get_budget_progress", lambda: get_budget_progress(db, user_id)),
+        ("budget_overview_util.load_category_budgets",
+         lambda: budget_overview_util.load_category_budgets(db, user_id)),
+        ("budget_overview_util.load_daily_spending",
+         lambda: budget_overview_util.load_daily_spending(db, user_id, category_name)),
+        ("budget_overview_util.build_budget_overview",
+         lambda: budget_overview_util.build_budget_overview(categories, daily)),
+        ("budget_overview_util.load_budget_overview",
+         lambda: budget_overview_util.load_budget_overview(db, user_id, category_name)),
+        ("dashboard_utils.get_dashboard_summary", lambda: get_dashboard_summary(
+            db, user_id, "expense", year_start, today)),
+        ("category_utils.get_all_categories_with_budget",
+         lambda: get_all_categories_with_budget(db, user_id)),
+    ]
+
+
+def run_micro(user_ids, repeat):
+    cache.configure(None)
+    results = {}
+    with SessionLocal() as db:
+        for name, call in micro_cases(db, user_ids[0]):
+            call()  # warm up
+            db.expire_all()
+            with count_queries(engine) as statements:
+                call()
+            timings = []
+            for i in range(repeat):
+                db.expire_all()
+                start = time.perf_counter()
+                call()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = {**percentiles(timings), "queries": len(statements), "runs": repeat}
+            print(f"{name:<48} p50 {results[name]['p50']:8.2f} ms  {len(statements):>3} queries")
+    return results
+
+
+async def http_load(base, user_ids, clients, seconds, rng_seed):
+    import httpx
+
+    samples = {path: [] for path in HTTP_MIX}
+    errors = {path: 0 for path in HTTP_MIX}
+    queries = {path: [] for path in HTTP_MIX}
+    paths, weights = list(HTTP_MIX), list(HTTP_MIX.values())
+
+    async def client_loop(n):
+        rng = random.Random(rng_seed + n)
+        user = n % len(user_ids)
+        async with httpx.AsyncClient(base_url=base, timeout=120) as client:
+            response = await client.post("/login", data={"email": f"bench{user}@example.com", "password": "bench"})
+            if response.status_code != 302:
+                raise RuntimeError(f"login failed for bench{user}: {response.status_code}")
+            while time.perf_counter() < deadline:
+                path = rng.choices(paths, weights)[0]
+                start = time.perf_counter()
+                response = await client.get(path)
+                await response.aread()
+                samples[path].append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    errors[path] += 1
+                match = SERVER_TIMING_QUERIES.search(response.headers.get("server-timing", ""))
+                if match:
+                    queries[path].append(int(match.group(1)))
+
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(n) for n in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for path in HTTP_MIX:
+        results[path] = {
+            **percentiles(samples[path]),
+            "requests": len(samples[path]),
+            "rps": round(len(samples[path]) / elapsed, 2),
+            "errors": errors[path],
+            "queries": round(sum(queries[path]) / len(queries[path]), 2) if queries[path] else None,
+        }
+    total = sum(len(s) for s in samples.values())
+    results["total"] = {**percentiles([ms for s in samples.values() for ms in s]),
+                        "requests": total, "rps": round(total / elapsed, 2), "errors": sum(errors.values())}
+    return results
+
+
+def run_http(user_ids, clients, seconds, port, cache_backend, rng_seed):
+    # Cheap hashes: the scenario measures pages, not bcrypt
+    with engine.begin() as conn:
+        conn.execute(update(User).values(password=bcrypt.using(rounds=4).hash("bench")))
+
+    env = dict(os.environ, CACHE_BACKEND=cache_backend, BCRYPT_ROUNDS="4", PASSWORD_HASH_WORKERS="0",
+               SECRET_KEY="bench", QUERY_PROFILER="1")
+    base = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        wait_until_up(f"{base}/login")
+        results = asyncio.run(http_load(base, user_ids, clients, seconds, rng_seed))
+    finally:
+        server.terminate()
+        server.wait()
+
+    for path, stats in results.items():
+        print(f"{path:<34} p50 {stats['p50'] or 0:8.1f} ms  p99 {stats['p99'] or 0:8.1f} ms  "
+              f"{stats['rps']:7.1f} req/s  {stats['errors']} errors")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=5_000, help="per user")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=30, help="runs per micro-benchmark")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--cache", default="memory", choices=["memory", "none"],
+                        help="CACHE_BACKEND of the HTTP server")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--out", help="JSON file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    reset(engine)
+    user_ids = seed(engine, users=args.users, transactions_per_user=args.transactions,
+                    years=args.years, rng_seed=args.seed)
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+    }
+    if not args.skip_micro:
+        print("micro-benchmarks (aggregate cache off)")
+        report["micro"] = run_micro(user_ids, args.repeat)
+    if not args.skip_http:
+        print(f"\nHTTP: {args.clients} clients for {args.seconds:.0f} s, cache {args.cache}")
+        report["http"] = run_http(user_ids, args.clients, args.seconds, args.port, args.cache, args.seed)
+
+    out = args.out or os.path.join("benchmarks", "results", f"{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\nwrote {out}")
+
+
+if __name__ == "__main__":
+    main()